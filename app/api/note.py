@@ -1,30 +1,97 @@
 import os
-from fastapi import APIRouter, HTTPException, Depends, status, Request
+import base64
+import binascii
+from enum import Enum
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Depends,
+    status,
+    Request,
+    Response,
+    Query,
+    Body,
+)
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import text
+from sqlalchemy import (
+    Integer,
+    String,
+    tuple_,
+    func,
+    literal_column,
+    insert,
+    update,
+    delete,
+    values,
+    column,
+    cast,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from loguru import logger
 from datetime import datetime
-from schemas.note import NoteCreate, NoteUpdate, NoteResponse
-from models.note import NoteModel
-from database import Database
+from schemas.note import (
+    NoteCreate,
+    NoteUpdate,
+    NoteResponse,
+    NoteSearchResult,
+    NoteBulkUpdate,
+    NoteBulkResult,
+    NoteView,
+    NoteField,
+    NoteSummary,
+)
+from models.note import NoteModel, SEARCH_CONFIG
+from database import db
+from cache import create_backend, note_cache
+from replicas import DATABASE_READ_YOUR_WRITES_BACKEND, RecentWrites
+from conditional import conditional_response, make_etag
+from serialization import FastJSONResponse, RowSerializer, dumps
+from token_cache import TOKEN_LEEWAY, TOKEN_VERIFY_NBF, TokenClaimsError, token_cache
 from jose import JWTError, jwt
-from typing import List
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-
-# from sqlalchemy.dialects.postgresql import ARRAY
+from typing import List, Optional, Tuple, Union
+from rate_limit import route_limit
 
 router = APIRouter()
-db = Database()
-
-limiter = Limiter(key_func=get_remote_address)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
+# Размер страницы списка заметок по умолчанию и максимально допустимый
+NOTES_PAGE_SIZE = int(os.getenv("NOTES_PAGE_SIZE", 100))
+NOTES_MAX_PAGE_SIZE = int(os.getenv("NOTES_MAX_PAGE_SIZE", 1000))
+# Сколько строк за раз забирать из серверного курсора при потоковой выдаче
+NOTES_STREAM_CHUNK_SIZE = int(os.getenv("NOTES_STREAM_CHUNK_SIZE", 500))
+# Максимальное число заметок в одном пакетном запросе
+NOTES_BULK_MAX_ITEMS = int(os.getenv("NOTES_BULK_MAX_ITEMS", 1000))
+
+# Колонки, которые отдаются клиенту (схема NoteResponse)
+NOTE_COLUMNS = (
+    NoteModel.id,
+    NoteModel.title,
+    NoteModel.content,
+    NoteModel.tags,
+    NoteModel.created_at,
+    NoteModel.updated_at,
+)
+SUMMARY_FIELDS = ("id", "title", "tags", "created_at", "updated_at")
+# Максимальная длина превью содержимого в списках
+NOTES_MAX_PREVIEW = int(os.getenv("NOTES_MAX_PREVIEW", 1000))
+# Быстрый путь для списков: готовый JSON без валидации через response_model
+NOTES_FAST_JSON = os.getenv("NOTES_FAST_JSON", "false").lower() in ("1", "true")
+
+
+def decode_token(token: str) -> dict:
+    return jwt.decode(
+        token,
+        SECRET_KEY,
+        algorithms=[ALGORITHM],
+        options={"verify_nbf": TOKEN_VERIFY_NBF, "leeway": TOKEN_LEEWAY},
+    )
+
 
 def get_current_user_id(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -33,65 +100,641 @@ def get_current_user_id(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_cache.verify(token, decode_token)
         user_id: int = payload.get("user_id")
         if user_id is None:
             raise credentials_exception
-    except JWTError:
+    except (JWTError, TokenClaimsError):
         raise credentials_exception
     return user_id
 
 
+# Отметки о записях для read-your-writes; без бэкенда чтения идут в primary
+recent_writes = RecentWrites(create_backend(DATABASE_READ_YOUR_WRITES_BACKEND))
+
+
+async def get_read_session(user_id: int = Depends(get_current_user_id)):
+    """Сессия для чтения: реплика, если пользователь недавно ничего не записывал"""
+    use_primary = bool(db.replicas) and await recent_writes.contains(user_id)
+    async for session in db.get_read_session(use_primary):
+        yield session
+
+
+async def get_write_session(user_id: int = Depends(get_current_user_id)):
+    """Сессия primary; после записи чтения пользователя ненадолго идут в primary"""
+    async for session in db.get_session():
+        yield session
+    if db.replicas:
+        await recent_writes.mark(user_id)
+
+
+def encode_cursor(note) -> str:
+    """Курсор keyset-пагинации: (updated_at, id) последней отданной заметки"""
+    raw = f"{note.updated_at.isoformat()}|{note.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        updated_at, note_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(updated_at), int(note_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def paginate(query, after: Optional[str], limit: Optional[int]):
+    """Стабильная сортировка по (updated_at, id) и отсечка по курсору"""
+    query = query.order_by(NoteModel.updated_at.desc(), NoteModel.id.desc())
+    if after:
+        query = query.where(
+            tuple_(NoteModel.updated_at, NoteModel.id) < decode_cursor(after)
+        )
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def dump_note(note) -> dict:
+    """JSON-совместимое представление заметки для кэша"""
+    return NoteResponse.model_validate(note, from_attributes=True).model_dump(
+        mode="json"
+    )
+
+
+class NoteProjection:
+    """Набор колонок списка заметок: view=summary, fields=... и preview=N.
+
+    Колонки выбираются на уровне SQL, content без запроса не читается вовсе.
+    """
+
+    def __init__(
+        self,
+        view: NoteView = NoteView.full,
+        fields: Optional[List[NoteField]] = Query(None),
+        preview: Optional[int] = Query(None, ge=1, le=NOTES_MAX_PREVIEW),
+    ):
+        if fields:
+            requested = {"id"} | {field.value for field in fields}
+        elif view is NoteView.summary:
+            requested = set(SUMMARY_FIELDS)
+        else:
+            requested = {column.key for column in NOTE_COLUMNS}
+        if preview:
+            requested.add("content_preview")
+        columns = {column.key: column for column in NOTE_COLUMNS}
+        if preview:
+            columns["content_preview"] = func.left(NoteModel.content, preview).label(
+                "content_preview"
+            )
+        # Порядок полей как в схеме ответа, чтобы быстрый путь давал тот же JSON
+        self.keys = [key for key in NoteSummary.model_fields if key in requested]
+        self.columns = [columns[key] for key in self.keys]
+        if "updated_at" not in requested:
+            # Нужен для курсора пагинации, но клиенту не отдается
+            self.columns.append(NoteModel.updated_at)
+        self.preview = preview
+        self.dump = RowSerializer(self.keys)
+
+    def params(self) -> dict:
+        """Все, что меняет тело ответа: входит в ключ кэша и ETag списка"""
+        return {"fields": self.keys, "preview": self.preview}
+
+
+async def load_page(
+    db: AsyncSession,
+    filters: list,
+    projection: NoteProjection,
+    after: Optional[str],
+    limit: Optional[int],
+):
+    """Страница заметок и курсор следующей страницы (None, если она последняя)"""
+    page_size = limit or NOTES_PAGE_SIZE
+    query = select(*projection.columns).where(*filters)
+    # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+    result = await db.execute(paginate(query, after, page_size + 1))
+    rows = result.all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1])
+    return {"notes": projection.dump.many(rows), "next_cursor": next_cursor}
+
+
+def list_response(response: Response, notes: List[dict]):
+    """Ответ со списком заметок: при NOTES_FAST_JSON сразу JSON-байты.
+
+    Словари уже соответствуют схеме NoteSummary (их строит RowSerializer),
+    поэтому повторная валидация каждой строки не нужна.
+    """
+    if NOTES_FAST_JSON:
+        return FastJSONResponse(notes, headers=dict(response.headers))
+    return notes
+
+
+async def check_list_modified(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    user_id: int,
+    filters: list,
+    params: dict,
+) -> Optional[Response]:
+    """Условный GET для списков: ETag по count/max(updated_at) выборки.
+
+    Проба дешевая (индекс по user_id, updated_at) и кэшируется вместе со
+    списками, поэтому неизменившийся список не читается и не сериализуется.
+    Last-Modified не отдается: max(updated_at) не меняется при удалении
+    заметки или ее выходе из фильтра по тегам, это видно только по count.
+    """
+
+    async def load_probe():
+        result = await db.execute(
+            select(func.count(NoteModel.id), func.max(NoteModel.updated_at)).where(
+                *filters
+            )
+        )
+        count, last_modified = result.one()
+        return {
+            "count": count,
+            "last_modified": last_modified.isoformat() if last_modified else None,
+        }
+
+    probe = await note_cache.get_list(user_id, {"probe": True, **params}, load_probe)
+    return conditional_response(request, response, make_etag(probe, params))
+
+
+async def stream_notes(query, projection: NoteProjection, bind):
+    """Отдает заметки в формате NDJSON по мере чтения из серверного курсора.
+
+    Сессия открывается внутри генератора: зависимость с сессией закрывается
+    до того, как начнется отправка тела ответа. bind - движок сессии
+    запроса, чтобы поток читался из той же реплики или primary.
+    """
+    async with AsyncSession(bind) as session:
+        result = await session.stream(
+            query.execution_options(yield_per=NOTES_STREAM_CHUNK_SIZE)
+        )
+        async for row in result:
+            yield dumps(projection.dump(row)) + b"\n"
+
+
 @router.post("/notes/", response_model=NoteResponse)
-@limiter.limit("20/minute")
+@route_limit("20/minute")
 async def create_note(
     request: Request,
     note: NoteCreate,
-    db: AsyncSession = Depends(db.get_session),
+    db: AsyncSession = Depends(get_write_session),
     user_id: int = Depends(get_current_user_id),
 ):
     try:
-        logger.info(f"Создание новой заметки для пользователя с ID: {user_id}")
-        db_note = NoteModel(
-            **note.dict(),
-            user_id=user_id,  # Привязываем заметку к user_id
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-        )
-        db.add(db_note)
+        logger.info("Создание новой заметки для пользователя с ID: {}", user_id)
+        now = datetime.utcnow()
+        # INSERT ... RETURNING вместо add + commit + refresh
+        result = await db.execute(
+            insert(NoteModel)
+            .values(
+                **note.dict(),
+                user_id=user_id,  # Привязываем заметку к user_id
+                created_at=now,
+                updated_at=now,
+            )
+            .returning(*NOTE_COLUMNS)
+        )
+        db_note = dict(result.mappings().one())
         await db.commit()
-        await db.refresh(db_note)
-        logger.info(f"Заметка {db_note.id} успешно создана")
+        await note_cache.invalidate(user_id)
+        logger.info("Заметка {} успешно создана", db_note["id"])
         return db_note
     except Exception as e:
         logger.error(f"Ошибка при создании заметки: {e}")
         raise HTTPException(status_code=500, detail="Ошибка при создании заметки")
 
 
+class TagMatch(str, Enum):
+    all = "all"  # заметка содержит все теги (@>)
+    any = "any"  # заметка содержит хотя бы один тег (&&)
+
+
+async def find_notes_by_tags(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    user_id: int,
+    tags: List[str],
+    match: TagMatch,
+    projection: NoteProjection,
+    limit: Optional[int],
+    after: Optional[str],
+):
+    try:
+        logger.info(
+            "Запрос на поиск заметок с тегами {} ({}) для пользователя с ID: {}",
+            tags,
+            match.value,
+            user_id,
+        )
+        # Операторы массивов PostgreSQL используют GIN-индекс ix_notes_tags
+        if match is TagMatch.all:
+            condition = NoteModel.tags.contains(tags)
+        else:
+            condition = NoteModel.tags.overlap(tags)
+        filters = [NoteModel.user_id == user_id, condition]
+        params = {
+            "tags": sorted(tags),
+            "match": match.value,
+            "limit": limit,
+            "after": after,
+            **projection.params(),
+        }
+
+        not_modified = await check_list_modified(
+            request, response, db, user_id, filters, params
+        )
+        if not_modified:
+            return not_modified
+
+        page = await note_cache.get_list(
+            user_id, params, lambda: load_page(db, filters, projection, after, limit)
+        )
+        notes = page["notes"]
+
+        if not notes:
+            logger.warning(
+                f"Заметки с тегами {tags} не найдены для пользователя с ID {user_id}"
+            )
+            raise HTTPException(status_code=404, detail="Заметки не найдены")
+
+        if page["next_cursor"]:
+            response.headers["X-Next-Cursor"] = page["next_cursor"]
+
+        logger.info(
+            "Найдено {} заметок с тегами {} для пользователя с ID: {}",
+            len(notes),
+            tags,
+            user_id,
+        )
+        return list_response(response, notes)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Ошибка при поиске заметок с тегами {tags}: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при поиске заметок: {e}")
+
+
+# Объявлен до /notes/{note_id}, иначе путь /notes/tags уйдет в read_note
+@router.get(
+    "/notes/tags", response_model=List[NoteSummary], response_model_exclude_unset=True
+)
+@route_limit("20/minute")
+async def search_notes_by_tags(
+    request: Request,
+    response: Response,
+    tags: List[str] = Query(..., min_length=1),
+    match: TagMatch = TagMatch.all,
+    limit: Optional[int] = Query(None, ge=1, le=NOTES_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    projection: NoteProjection = Depends(),
+    db: AsyncSession = Depends(get_read_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    return await find_notes_by_tags(
+        request, response, db, user_id, tags, match, projection, limit, after
+    )
+
+
+# Параметры ts_headline для фрагментов с подсветкой
+SEARCH_HEADLINE_OPTIONS = os.getenv(
+    "SEARCH_HEADLINE_OPTIONS",
+    "StartSel=<b>, StopSel=</b>, MaxFragments=2, MaxWords=30, MinWords=10",
+)
+
+
+def escape_html(column):
+    """HTML-экранирование текста на стороне базы: &, < и > как сущности"""
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;")):
+        column = func.replace(column, char, entity)
+    return column
+
+
+@router.get("/notes/search", response_model=List[NoteSearchResult])
+@route_limit("20/minute")
+async def search_notes(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1, le=NOTES_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    highlight: bool = False,
+    db: AsyncSession = Depends(get_read_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    try:
+        logger.info(
+            "Полнотекстовый поиск '{}' для пользователя с ID: {} "
+            "(limit={}, offset={}, highlight={})",
+            q,
+            user_id,
+            limit,
+            offset,
+            highlight,
+        )
+        config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+        tsquery = func.websearch_to_tsquery(config, q)
+        rank = func.ts_rank_cd(NoteModel.search_vector, tsquery)
+        page_size = limit or NOTES_PAGE_SIZE
+
+        # Сначала ранжируем и отсекаем страницу по индексу ix_notes_search_vector,
+        # а тяжелый ts_headline считаем только для попавших в нее строк
+        ranked = (
+            select(NoteModel.id, rank.label("rank"))
+            .where(
+                NoteModel.user_id == user_id,
+                NoteModel.search_vector.bool_op("@@")(tsquery),
+            )
+            .order_by(rank.desc(), NoteModel.id.desc())
+            .offset(offset)
+            .limit(page_size + 1)
+            .subquery()
+        )
+        if highlight:
+            # snippet - HTML: текст заметки экранируется до подсветки, поэтому
+            # разметкой в нем остаются только StartSel/StopSel
+            body = [
+                func.ts_headline(
+                    config,
+                    escape_html(NoteModel.content),
+                    tsquery,
+                    SEARCH_HEADLINE_OPTIONS,
+                ).label("snippet")
+            ]
+        else:
+            body = [NoteModel.content]
+        query = (
+            select(
+                NoteModel.id,
+                NoteModel.title,
+                NoteModel.tags,
+                NoteModel.created_at,
+                NoteModel.updated_at,
+                ranked.c.rank,
+                *body,
+            )
+            .join(ranked, NoteModel.id == ranked.c.id)
+            .order_by(ranked.c.rank.desc(), NoteModel.id.desc())
+        )
+        result = await db.execute(query)
+        notes = result.mappings().all()
+
+        if not notes:
+            logger.warning(
+                f"По запросу '{q}' ничего не найдено для пользователя с ID {user_id}"
+            )
+            raise HTTPException(status_code=404, detail="Заметки не найдены")
+
+        if len(notes) > page_size:
+            notes = notes[:page_size]
+            response.headers["X-Next-Offset"] = str(offset + page_size)
+
+        logger.info(
+            "Найдено {} заметок по запросу '{}' для пользователя с ID: {}",
+            len(notes),
+            q,
+            user_id,
+        )
+        return notes
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Ошибка при полнотекстовом поиске '{q}': {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при поиске заметок: {e}")
+
+
+def bulk_results(ids: List[int], rows) -> List[dict]:
+    """Результаты по каждому запрошенному id в порядке запроса"""
+    found = {row["id"]: dict(row) for row in rows}
+    return [
+        (
+            {"id": note_id, "status": 200, "note": found[note_id]}
+            if note_id in found
+            else {"id": note_id, "status": 404, "detail": "Заметка не найдена"}
+        )
+        for note_id in ids
+    ]
+
+
+def check_unique_ids(ids: List[int]):
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Повторяющиеся ID заметок в пакете")
+
+
+# Пакетные маршруты объявлены до /notes/{note_id}, иначе /notes/bulk уйдет туда.
+# Каждый пакет - один запрос к базе и одна транзакция
+@router.post("/notes/bulk", response_model=List[NoteBulkResult])
+@route_limit("10/minute")
+async def create_notes_bulk(
+    request: Request,
+    notes: List[NoteCreate] = Body(..., min_length=1, max_length=NOTES_BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_write_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    try:
+        logger.info(
+            "Пакетное создание {} заметок для пользователя с ID: {}",
+            len(notes),
+            user_id,
+        )
+        now = datetime.utcnow()
+        # Многострочный INSERT ... RETURNING, строки возвращаются в порядке пакета
+        result = await db.execute(
+            insert(NoteModel).returning(*NOTE_COLUMNS, sort_by_parameter_order=True),
+            [
+                {
+                    **note.dict(),
+                    "user_id": user_id,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for note in notes
+            ],
+        )
+        created = [dict(row) for row in result.mappings()]
+        await db.commit()
+        await note_cache.invalidate(user_id)
+        logger.info(
+            "Создано {} заметок для пользователя с ID: {}", len(created), user_id
+        )
+        return [{"id": note["id"], "status": 200, "note": note} for note in created]
+    except Exception as e:
+        logger.error(f"Ошибка при пакетном создании заметок: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка при создании заметок")
+
+
+@router.patch("/notes/bulk", response_model=List[NoteBulkResult])
+@route_limit("10/minute")
+async def update_notes_bulk(
+    request: Request,
+    notes: List[NoteBulkUpdate] = Body(
+        ..., min_length=1, max_length=NOTES_BULK_MAX_ITEMS
+    ),
+    db: AsyncSession = Depends(get_write_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    try:
+        ids = [note.id for note in notes]
+        check_unique_ids(ids)
+        logger.info(
+            "Пакетное обновление {} заметок для пользователя с ID: {}",
+            len(notes),
+            user_id,
+        )
+        # UPDATE ... FROM (VALUES ...): NULL в поле означает "не изменять"
+        changes = values(
+            column("id", Integer),
+            column("title", String),
+            column("content", String),
+            column("tags", ARRAY(String)),
+            name="changes",
+        ).data([(note.id, note.title, note.content, note.tags) for note in notes])
+        result = await db.execute(
+            update(NoteModel)
+            .where(NoteModel.id == changes.c.id, NoteModel.user_id == user_id)
+            .values(
+                # Явные приведения: колонка из одних NULL иначе получит тип text
+                title=func.coalesce(cast(changes.c.title, String), NoteModel.title),
+                content=func.coalesce(
+                    cast(changes.c.content, String), NoteModel.content
+                ),
+                tags=func.coalesce(cast(changes.c.tags, ARRAY(String)), NoteModel.tags),
+                updated_at=datetime.utcnow(),
+            )
+            .returning(*NOTE_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        updated = result.mappings().all()
+        await db.commit()
+        await note_cache.invalidate(user_id)
+        logger.info(
+            "Обновлено {} из {} заметок пользователя с ID: {}",
+            len(updated),
+            len(ids),
+            user_id,
+        )
+        return bulk_results(ids, updated)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Ошибка при пакетном обновлении заметок: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка при обновлении заметок")
+
+
+@router.delete("/notes/bulk", response_model=List[NoteBulkResult])
+@route_limit("10/minute")
+async def delete_notes_bulk(
+    request: Request,
+    ids: List[int] = Body(..., min_length=1, max_length=NOTES_BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_write_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    try:
+        check_unique_ids(ids)
+        logger.info(
+            "Пакетное удаление {} заметок для пользователя с ID: {}", len(ids), user_id
+        )
+        result = await db.execute(
+            delete(NoteModel)
+            .where(NoteModel.id.in_(ids), NoteModel.user_id == user_id)
+            .returning(NoteModel.id)
+            .execution_options(synchronize_session=False)
+        )
+        deleted = set(result.scalars().all())
+        await db.commit()
+        await note_cache.invalidate(user_id)
+        logger.info(
+            "Удалено {} из {} заметок пользователя с ID: {}",
+            len(deleted),
+            len(ids),
+            user_id,
+        )
+        return [
+            (
+                {"id": note_id, "status": 200, "detail": "Заметка успешно удалена"}
+                if note_id in deleted
+                else {"id": note_id, "status": 404, "detail": "Заметка не найдена"}
+            )
+            for note_id in ids
+        ]
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"Ошибка при пакетном удалении заметок: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка при удалении заметок")
+
+
+@router.get("/notes/bulk", response_model=List[NoteBulkResult])
+@route_limit("20/minute")
+async def read_notes_bulk(
+    request: Request,
+    ids: List[int] = Query(..., min_length=1, max_length=NOTES_BULK_MAX_ITEMS),
+    db: AsyncSession = Depends(get_read_session),
+    user_id: int = Depends(get_current_user_id),
+):
+    try:
+        logger.info(
+            "Запрос на получение {} заметок для пользователя с ID: {}",
+            len(ids),
+            user_id,
+        )
+        result = await db.execute(
+            select(*NOTE_COLUMNS).where(
+                NoteModel.id.in_(ids), NoteModel.user_id == user_id
+            )
+        )
+        return bulk_results(ids, result.mappings().all())
+    except Exception as e:
+        logger.error(f"Ошибка при пакетном получении заметок: {e}")
+        raise HTTPException(status_code=500, detail="Ошибка при получении заметок")
+
+
 @router.get("/notes/{note_id}", response_model=NoteResponse)
-@limiter.limit("20/minute")
+@route_limit("20/minute")
 async def read_note(
     request: Request,
+    response: Response,
     note_id: int,
-    db: AsyncSession = Depends(db.get_session),
+    db: AsyncSession = Depends(get_read_session),
     user_id: int = Depends(get_current_user_id),
 ):
     try:
         logger.info(
-            f"Запрос на получение заметки с ID: {note_id} для пользователя с ID: {user_id}"
+            "Запрос на получение заметки с ID: {} для пользователя с ID: {}",
+            note_id,
+            user_id,
         )
-        result = await db.execute(
-            select(NoteModel).where(
-                NoteModel.id == note_id, NoteModel.user_id == user_id
+
+        async def load_note():
+            result = await db.execute(
+                select(NoteModel).where(
+                    NoteModel.id == note_id, NoteModel.user_id == user_id
+                )
             )
+            note = result.scalars().first()
+            if not note:
+                logger.warning(
+                    f"Заметка с ID {note_id} не найдена или не принадлежит пользователю с ID {user_id}"
+                )
+                raise HTTPException(status_code=404, detail="Заметка не найдена")
+            return dump_note(note)
+
+        note = await note_cache.get_note(user_id, note_id, load_note)
+        updated_at = datetime.fromisoformat(note["updated_at"])
+        not_modified = conditional_response(
+            request, response, make_etag(note["id"], note["updated_at"]), updated_at
         )
-        note = result.scalars().first()
-        if not note:
-            logger.warning(
-                f"Заметка с ID {note_id} не найдена или не принадлежит пользователю с ID {user_id}"
-            )
-            raise HTTPException(status_code=404, detail="Заметка не найдена")
-        logger.info(f"Заметка с ID {note_id} успешно получена")
+        if not_modified:
+            logger.info("Заметка с ID {} не изменилась", note_id)
+            return not_modified
+        logger.info("Заметка с ID {} успешно получена", note_id)
         return note
     except HTTPException as e:
         raise e
@@ -101,26 +744,34 @@ async def read_note(
 
 
 @router.put("/notes/{note_id}", response_model=NoteResponse)
-@limiter.limit("20/minute")
+@route_limit("20/minute")
 async def update_note(
     request: Request,
     note_id: int,
     note: NoteUpdate,
-    db: AsyncSession = Depends(db.get_session),
+    db: AsyncSession = Depends(get_write_session),
     user_id: int = Depends(get_current_user_id),
 ):
     try:
         logger.info(
-            f"Запрос на обновление заметки с ID: {note_id} для пользователя с ID: {user_id}"
+            "Запрос на обновление заметки с ID: {} для пользователя с ID: {}",
+            note_id,
+            user_id,
         )
 
-        # Получаем заметку по ID
+        # Один UPDATE ... RETURNING: проверка владельца в WHERE, обновляются
+        # только предоставленные пользователем поля
         result = await db.execute(
-            select(NoteModel).where(
-                NoteModel.id == note_id, NoteModel.user_id == user_id
+            update(NoteModel)
+            .where(NoteModel.id == note_id, NoteModel.user_id == user_id)
+            .values(
+                **note.dict(exclude_none=True),
+                updated_at=datetime.utcnow(),  # Обновляем время модификации
             )
+            .returning(*NOTE_COLUMNS)
+            .execution_options(synchronize_session=False)
         )
-        db_note = result.scalars().first()
+        db_note = result.mappings().first()
 
         if not db_note:
             logger.warning(
@@ -128,20 +779,11 @@ async def update_note(
             )
             raise HTTPException(status_code=404, detail="Заметка не найдена")
 
-        # Обновляем только предоставленные пользователем поля
-        if note.title is not None:
-            db_note.title = note.title
-        if note.content is not None:
-            db_note.content = note.content
-        if note.tags is not None:
-            db_note.tags = note.tags
-
-        db_note.updated_at = datetime.utcnow()  # Обновляем время модификации
-
+        db_note = dict(db_note)
         await db.commit()
-        await db.refresh(db_note)
+        await note_cache.invalidate(user_id)
 
-        logger.info(f"Заметка с ID {note_id} успешно обновлена")
+        logger.info("Заметка с ID {} успешно обновлена", note_id)
         return db_note
     except HTTPException as e:
         raise e
@@ -151,31 +793,34 @@ async def update_note(
 
 
 @router.delete("/notes/{note_id}")
-@limiter.limit("20/minute")
+@route_limit("20/minute")
 async def delete_note(
     request: Request,
     note_id: int,
-    db: AsyncSession = Depends(db.get_session),
+    db: AsyncSession = Depends(get_write_session),
     user_id: int = Depends(get_current_user_id),
 ):
     try:
         logger.info(
-            f"Запрос на удаление заметки с ID: {note_id} для пользователя с ID: {user_id}"
+            "Запрос на удаление заметки с ID: {} для пользователя с ID: {}",
+            note_id,
+            user_id,
         )
+        # Один DELETE ... RETURNING id: пустой результат - заметки нет или она чужая
         result = await db.execute(
-            select(NoteModel).where(
-                NoteModel.id == note_id, NoteModel.user_id == user_id
-            )
+            delete(NoteModel)
+            .where(NoteModel.id == note_id, NoteModel.user_id == user_id)
+            .returning(NoteModel.id)
+            .execution_options(synchronize_session=False)
         )
-        note = result.scalars().first()
-        if not note:
+        if result.scalar() is None:
             logger.warning(
                 f"Заметка с ID {note_id} не найдена или не принадлежит пользователю с ID {user_id}"
             )
             raise HTTPException(status_code=404, detail="Заметка не найдена")
-        await db.delete(note)
         await db.commit()
-        logger.info(f"Заметка с ID {note_id} успешно удалена")
+        await note_cache.invalidate(user_id)
+        logger.info("Заметка с ID {} успешно удалена", note_id)
         return {"detail": "Заметка успешно удалена"}
     except HTTPException as e:
         raise e
@@ -184,78 +829,86 @@ async def delete_note(
         raise HTTPException(status_code=500, detail="Ошибка при удалении заметки")
 
 
-@router.get("/notes/tag/{tag}", response_model=List[NoteResponse])
-@limiter.limit("20/minute")
+@router.get(
+    "/notes/tag/{tag}",
+    response_model=List[NoteSummary],
+    response_model_exclude_unset=True,
+)
+@route_limit("20/minute")
 async def search_notes_by_tag(
     request: Request,
+    response: Response,
     tag: str,
-    db: AsyncSession = Depends(db.get_session),
+    limit: Optional[int] = Query(None, ge=1, le=NOTES_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    projection: NoteProjection = Depends(),
+    db: AsyncSession = Depends(get_read_session),
     user_id: int = Depends(get_current_user_id),
 ):
-    try:
-        logger.info(
-            f"Запрос на поиск заметок с тегом '{tag}' для пользователя с ID: {user_id}"
-        )
-        # Не смог реализовать так из-за ошибки имплимента для ARRAY
-        # result = await db.execute(
-        #     select(NoteModel).where(
-        #         NoteModel.user_id == user_id,
-        #         NoteModel.tags.contains(
-        #             [tag]
-        #         ),  # Проверяем, содержит ли теги список с указанным тегом
-        #     )
-        # )
-        # notes = result.scalars().all()
-
-        # Выполняем сырой SQL-запрос для поиска заметок по тегу
-        query = text(
-            """
-            SELECT * FROM notes
-            WHERE user_id = :user_id
-            AND :tag = ANY(tags);
-        """
-        )
-        result = await db.execute(query, {"user_id": user_id, "tag": tag})
-        notes = result.mappings().all()
-
-        if not notes:
-            logger.warning(
-                f"Заметки с тегом '{tag}' не найдены для пользователя с ID {user_id}"
-            )
-            raise HTTPException(status_code=404, detail="Заметки не найдены")
-
-        logger.info(
-            f"Найдено {len(notes)} заметок с тегом '{tag}' для пользователя с ID: {user_id}"
-        )
-        return notes
-    except Exception as e:
-        logger.error(f"Ошибка при поиске заметок с тегом '{tag}': {e}")
-        raise HTTPException(status_code=500, detail=f"Ошибка при поиске заметок: {e}")
+    return await find_notes_by_tags(
+        request, response, db, user_id, [tag], TagMatch.all, projection, limit, after
+    )
 
 
-@router.get("/notes/", response_model=List[NoteResponse])
-@limiter.limit("20/minute")
+# Списки отдают проекцию заметки: без fields/view/preview это все поля NoteResponse
+@router.get(
+    "/notes/", response_model=List[NoteSummary], response_model_exclude_unset=True
+)
+@route_limit("20/minute")
 async def get_all_notes(
     request: Request,
-    db: AsyncSession = Depends(db.get_session),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=NOTES_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+    projection: NoteProjection = Depends(),
+    db: AsyncSession = Depends(get_read_session),
     user_id: int = Depends(get_current_user_id),
 ):
     try:
 
         logger.info(
-            f"Запрос на получение всех заметок для пользователя с ID: {user_id}"
+            "Запрос на получение заметок для пользователя с ID: {} "
+            "(limit={}, after={}, stream={})",
+            user_id,
+            limit,
+            after,
+            stream,
+        )
+        filters = [NoteModel.user_id == user_id]
+
+        if stream:
+            # Потоковая выдача: память на запрос не зависит от числа заметок
+            query = select(*projection.columns).where(*filters)
+            return StreamingResponse(
+                stream_notes(paginate(query, after, limit), projection, db.bind),
+                media_type="application/x-ndjson",
+            )
+
+        params = {"limit": limit, "after": after, **projection.params()}
+        not_modified = await check_list_modified(
+            request, response, db, user_id, filters, params
         )
-        # Выполняем запрос для получения всех заметок текущего пользователя
-        result = await db.execute(select(NoteModel).where(NoteModel.user_id == user_id))
-        notes = result.scalars().all()
+        if not_modified:
+            return not_modified
+
+        page = await note_cache.get_list(
+            user_id, params, lambda: load_page(db, filters, projection, after, limit)
+        )
+        notes = page["notes"]
 
         if not notes:
             logger.warning(f"Заметки не найдены для пользователя с ID {user_id}")
             raise HTTPException(status_code=404, detail="Заметки не найдены")
 
-        logger.info(f"Найдено {len(notes)} заметок для пользователя с ID: {user_id}")
-        return notes
+        if page["next_cursor"]:
+            response.headers["X-Next-Cursor"] = page["next_cursor"]
 
+        logger.info("Найдено {} заметок для пользователя с ID: {}", len(notes), user_id)
+        return list_response(response, notes)
+
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(
             f"Ошибка при получении заметок для пользователя с ID {user_id}: {e}"
@@ -3,7 +3,7 @@ from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from datetime import timedelta, datetime
-from passlib.context import CryptContext
+from typing import Optional
 from jose import jwt, JWTError
 from loguru import logger
 from schemas.user import (
@@ -14,16 +14,13 @@ from schemas.user import (
     UserResponse,
 )
 from models.user import UserModel
-from database import Database
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from database import db
+from hashing import HashQueueFull, password_hasher
+from login_cache import login_cache
+from rate_limit import route_limit
 
 
 router = APIRouter()
-db = Database()
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-limiter = Limiter(key_func=get_remote_address)
 
 
 SECRET_KEY = os.getenv("SECRET_KEY")
@@ -31,21 +28,28 @@ ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
+
 
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+
+def overloaded_exception():
+    return HTTPException(
+        status_code=503, detail="Сервер перегружен, повторите попытку позже"
+    )
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
+    issued_at = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = issued_at + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+        expire = issued_at + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": issued_at})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -57,17 +61,20 @@ async def authenticate_user(db: AsyncSession, username: str, password: str):
             select(UserModel).where(UserModel.username == username)
         )
         user = result.scalars().first()
-        if not user or not verify_password(password, user.hashed_password):
+        if not user or not await verify_password(password, user.hashed_password):
             logger.warning(f"Неверные учетные данные для пользователя: {username}")
             return False
         return user
+    except HashQueueFull:
+        logger.warning("Очередь хэширования паролей переполнена")
+        raise overloaded_exception()
     except Exception as e:
         logger.error(f"Ошибка аутентификации: {e}")
         raise HTTPException(status_code=500, detail="Ошибка сервера")
 
 
 @router.post("/register", response_model=UserResponse)
-@limiter.limit("3/minute")
+@route_limit("3/minute")
 async def create_user(
     request: Request, user: UserCreate, db: AsyncSession = Depends(db.get_session)
 ):
@@ -75,21 +82,25 @@ async def create_user(
         logger.info(f"Создание пользователя: {user.username}")
         db_user = UserModel(
             username=user.username,
-            hashed_password=get_password_hash(user.password),
+            hashed_password=await get_password_hash(user.password),
             telegram_id=user.telegram_id,  # Устанавливаем telegram_id
         )
         db.add(db_user)
         await db.commit()
         await db.refresh(db_user)
+        await login_cache.invalidate(user.telegram_id)
         logger.info(f"Пользователь {user.username} успешно создан")
         return db_user
+    except HashQueueFull:
+        logger.warning("Очередь хэширования паролей переполнена")
+        raise overloaded_exception()
     except Exception as e:
         logger.error(f"Ошибка создания пользователя: {e}")
         raise HTTPException(status_code=500, detail="Ошибка создания пользователя")
 
 
 @router.post("/login", response_model=dict)
-@limiter.limit("3/minute")
+@route_limit("3/minute")
 async def login_for_access_token(
     request: Request, form_data: UserLogin, db: AsyncSession = Depends(db.get_session)
 ):
@@ -109,7 +120,7 @@ async def login_for_access_token(
 
 
 @router.post("/add_telegram", response_model=UserResponse)
-@limiter.limit("3/minute")
+@route_limit("3/minute")
 async def update_telegram_id_with_credentials(
     request: Request,
     form_data: AddUserTelegram,
@@ -129,28 +140,38 @@ async def update_telegram_id_with_credentials(
             )
 
         # Обновление telegram_id
+        old_telegram_id = user.telegram_id
         user.telegram_id = form_data.telegram_id
         db.add(user)
         await db.commit()
         await db.refresh(user)
+        await login_cache.invalidate(old_telegram_id, form_data.telegram_id)
         logger.info(f"Telegram ID пользователя {user.username} успешно обновлен")
         return user
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка обновления telegram_id: {e}")
         raise HTTPException(status_code=500, detail="Ошибка обновления telegram_id")
 
 
-async def authenticate_user_by_telegram_id(db: AsyncSession, telegram_id: str):
+async def authenticate_user_by_telegram_id(
+    db: AsyncSession, telegram_id: int
+) -> Optional[int]:
+    """id пользователя с этим telegram_id (через кэш) или None"""
     logger.info(f"Попытка аутентификации пользователя по telegram_id: {telegram_id}")
-    try:
+
+    async def load_user_id():
         result = await db.execute(
-            select(UserModel).where(UserModel.telegram_id == telegram_id)
+            select(UserModel.id).where(UserModel.telegram_id == telegram_id)
         )
-        user = result.scalars().first()
-        if not user:
+        return result.scalar()
+
+    try:
+        user_id = await login_cache.get_user_id(telegram_id, load_user_id)
+        if user_id is None:
             logger.warning(f"Пользователь с telegram_id {telegram_id} не найден")
-            return False
-        return user
+        return user_id
     except Exception as e:
         logger.error(f"Ошибка аутентификации: {e}")
         raise HTTPException(status_code=500, detail="Ошибка сервера")
@@ -160,17 +181,23 @@ async def authenticate_user_by_telegram_id(db: AsyncSession, telegram_id: str):
 async def login_by_telegram_id(
     form_data: LoginWithTelegram, db: AsyncSession = Depends(db.get_session)
 ):
-    user = await authenticate_user_by_telegram_id(db, form_data.telegram_id)
-    if not user:
+    user_id = await authenticate_user_by_telegram_id(db, form_data.telegram_id)
+    if user_id is None:
         logger.warning(f"Пользователь с telegram_id {form_data.telegram_id} не найден")
         raise HTTPException(
             status_code=401,
             detail="Пользователь с telegram_id не найден",
         )
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"user_id": user.id}, expires_delta=access_token_expires
-    )
+    # Недавно выпущенный токен отдается повторно, пока у него большой запас времени
+    access_token = await login_cache.get_token(user_id)
+    if access_token is None:
+        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        access_token = create_access_token(
+            data={"user_id": user_id}, expires_delta=access_token_expires
+        )
+        await login_cache.set_token(
+            user_id, access_token, int(access_token_expires.total_seconds())
+        )
     logger.info(
         f"Пользователь с telegram_id {form_data.telegram_id} успешно аутентифицирован"
     )
@@ -0,0 +1,75 @@
+"""Сравнение сериализации списка из 10 000 заметок.
+
+    cd app && python benchmarks/bench_serialization.py
+
+pydantic - путь по умолчанию: словари валидируются через List[NoteSummary]
+и кодируются JSONResponse, как это делает FastAPI с response_model.
+fast - RowSerializer по строкам Core-запроса и FastJSONResponse (orjson).
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from schemas.note import NoteSummary
+from serialization import FastJSONResponse, RowSerializer, orjson
+
+KEYS = ("id", "title", "content", "tags", "created_at", "updated_at")
+
+
+def make_rows(count: int) -> list:
+    start = datetime(2024, 1, 1)
+    return [
+        (
+            i,
+            f"Заметка {i}",
+            "Содержимое заметки " * 20,
+            ["работа", f"тег{i % 10}"],
+            start + timedelta(seconds=i),
+            start + timedelta(seconds=i, microseconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+def pydantic_path(rows: list, adapter: TypeAdapter) -> bytes:
+    serializer = RowSerializer(KEYS)
+    notes = adapter.validate_python([serializer(row) for row in rows])
+    content = adapter.dump_python(notes, mode="json", exclude_unset=True)
+    return JSONResponse(content).body
+
+
+def fast_path(rows: list) -> bytes:
+    return FastJSONResponse(RowSerializer(KEYS).many(rows)).body
+
+
+def measure(func, *args, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(count: int = 10_000):
+    rows = make_rows(count)
+    adapter = TypeAdapter(List[NoteSummary])
+    assert pydantic_path(rows, adapter) == fast_path(rows), "ответы различаются"
+
+    slow = measure(pydantic_path, rows, adapter)
+    fast = measure(fast_path, rows)
+    print(f"orjson: {'да' if orjson is not None else 'нет (json)'}")
+    print(f"pydantic: {slow * 1000:8.1f} мс, {count / slow:10.0f} заметок/с")
+    print(f"fast:     {fast * 1000:8.1f} мс, {count / fast:10.0f} заметок/с")
+    print(f"ускорение: x{slow / fast:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,262 @@
+"""Read-through кэш заметок с инвалидацией по пользователю.
+
+Ключи строятся по user_id и "поколению" пользователя: любая запись заметки
+сменяет поколение, и все закэшированные списки и заметки пользователя
+перестают находиться. Удалять ключи после записи нельзя: чтение, начатое до
+коммита, положило бы старую строку обратно уже после удаления. При смене
+поколения такая строка попадает под старый ключ, который больше не читается.
+
+Бэкенды:
+    memory - LRU с TTL внутри процесса (по умолчанию)
+    shm    - SQLite-файл на tmpfs, общий для воркеров одного хоста
+    redis  - общий кэш для нескольких воркеров (нужен пакет redis)
+    none   - кэш отключен
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from loguru import logger
+
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL = int(os.getenv("CACHE_TTL", 60))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_SHM_URI = os.getenv("CACHE_SHM_URI", "shm://notes-cache")
+# Сколько секунд ждать блокировку файла shm, пока пишет другой воркер
+CACHE_SHM_TIMEOUT = float(os.getenv("CACHE_SHM_TIMEOUT", 1))
+
+
+class MemoryCacheBackend:
+    """LRU-кэш с TTL в памяти процесса"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCacheBackend:
+    """Общий кэш в Redis (или совместимом сервере) для нескольких воркеров"""
+
+    def __init__(self, url: str = CACHE_REDIS_URL):
+        # Необязательная зависимость: нужна только при CACHE_BACKEND=redis
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self._redis.get(key)
+        return json.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        await self._redis.set(key, json.dumps(value), ex=ttl)
+
+    async def delete(self, key: str):
+        await self._redis.delete(key)
+
+
+class SharedMemoryCacheBackend:
+    """Кэш в SQLite-файле на tmpfs, общий для воркеров одного хоста.
+
+    shm://name - файл /dev/shm/name.sqlite (или во временном каталоге, если
+    /dev/shm нет); shm:///path/to/file - явный путь.
+    """
+
+    # Как часто (в записях) удалять истекшие ключи
+    CLEANUP_EVERY = 1000
+
+    def __init__(self, uri: str = CACHE_SHM_URI, timeout: float = CACHE_SHM_TIMEOUT):
+        location = uri.split("://", 1)[1]
+        if not location.startswith("/"):
+            directory = (
+                "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            )
+            location = os.path.join(directory, f"{location or 'notes-cache'}.sqlite")
+        self.path = location
+        self.timeout = timeout
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._writes = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # После fork соединение родителя использовать нельзя
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    async def get(self, key: str) -> Optional[Any]:
+        # Время общее для процессов, поэтому time.time(), а не monotonic
+        row = self.connection.execute(
+            "SELECT value FROM cache WHERE key = ? "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        now = time.time()
+        connection = self.connection
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + ttl if ttl else None),
+        )
+        self._writes += 1
+        if self._writes % self.CLEANUP_EVERY == 0:
+            connection.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+
+    async def delete(self, key: str):
+        self.connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+
+def create_backend(name: str = CACHE_BACKEND):
+    if name == "memory":
+        return MemoryCacheBackend()
+    if name == "shm":
+        return SharedMemoryCacheBackend()
+    if name == "redis":
+        return RedisCacheBackend()
+    if name == "none":
+        return None
+    raise ValueError(f"Неизвестный бэкенд кэша: {name}")
+
+
+class NoteCache:
+    """Кэш заметок и списков заметок пользователя.
+
+    Значения должны сериализоваться в JSON: в кэш кладутся словари,
+    а не ORM-объекты.
+    """
+
+    def __init__(self, backend=None, ttl: int = CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+    async def _read_through(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        if not self.enabled:
+            return await loader()
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            # Недоступный кэш не должен ломать чтение заметок
+            logger.error(f"Ошибка чтения из кэша: {e}")
+            return await loader()
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await loader()
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш: {e}")
+        return value
+
+    async def _generation(self, user_id: int) -> str:
+        """Текущее поколение списков пользователя.
+
+        Это случайная метка, а не счетчик: если ключ поколения вытеснен,
+        новое поколение не совпадет ни с одним из старых.
+        """
+        key = f"notes:{user_id}:gen"
+        generation = await self.backend.get(key)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            await self.backend.set(key, generation)
+        return generation
+
+    async def _read_scoped(
+        self, user_id: int, key: str, loader: Callable[[], Awaitable[Any]]
+    ):
+        """Чтение через кэш под ключом текущего поколения пользователя"""
+        if not self.enabled:
+            return await loader()
+        try:
+            generation = await self._generation(user_id)
+        except Exception as e:
+            logger.error(f"Ошибка чтения из кэша: {e}")
+            return await loader()
+        return await self._read_through(f"notes:{user_id}:{generation}:{key}", loader)
+
+    async def get_note(
+        self, user_id: int, note_id: int, loader: Callable[[], Awaitable[Any]]
+    ):
+        return await self._read_scoped(user_id, f"note:{note_id}", loader)
+
+    async def get_list(
+        self, user_id: int, params: dict, loader: Callable[[], Awaitable[Any]]
+    ):
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        return await self._read_scoped(user_id, digest, loader)
+
+    async def invalidate(self, user_id: int):
+        """Сброс списков и заметок пользователя после записи"""
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(f"notes:{user_id}:gen", uuid.uuid4().hex)
+        except Exception as e:
+            logger.error(f"Ошибка инвалидации кэша пользователя {user_id}: {e}")
+
+
+note_cache = NoteCache(create_backend())
@@ -1,27 +1,148 @@
 import os
-from sys import stdout
+import sys
+import time
 from loguru import logger
 from dotenv import load_dotenv
 
 # Загрузка переменных из .env файла
 load_dotenv()
 
+# Уровень логов по умолчанию и уровни отдельных модулей: "api.note=DEBUG,database=WARNING"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Формат файла логов: json (одна запись - одна строка JSON) или text
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# Строки уровня INFO и ниже из этих модулей (и помеченные logger.bind(sample=True))
+# пишутся не чаще LOG_SAMPLE_RATE раз в секунду с одного места в коде
+LOG_SAMPLE_MODULES = os.getenv("LOG_SAMPLE_MODULES", "api.note,api.user")
+LOG_SAMPLE_RATE = int(os.getenv("LOG_SAMPLE_RATE", 10))
+
+INFO_LEVEL = logger.level("INFO").no
+TEXT_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level} | {name} | {message}"
+
+
+class LogFilter:
+    """Фильтр записей: уровни по модулям и выборка частых строк.
+
+    Копия без правила медленных запросов есть у бота (telegram_bot/config.py).
+    """
+
+    def __init__(self, default_level: str, levels: str, sample_modules: str, rate: int):
+        self.levels = {"": logger.level(default_level).no}
+        for item in filter(None, (part.strip() for part in levels.split(","))):
+            module, level = item.split("=")
+            self.levels[module.strip()] = logger.level(level.strip().upper()).no
+        self.sample_modules = [
+            m.strip() for m in sample_modules.split(",") if m.strip()
+        ]
+        self.rate = rate
+        self._min_levels = {}
+        self._sampled_names = {}
+        self._windows = {}
+        self._last = (None, True)
+
+    @property
+    def lowest(self) -> int:
+        """Минимальный уровень синков: строки ниже него даже не форматируются"""
+        return min(self.levels.values())
+
+    def min_level(self, name: str) -> int:
+        """Уровень модуля: ближайший заданный родитель, например api для api.note"""
+        level = self._min_levels.get(name)
+        if level is None:
+            module = name
+            while module not in self.levels:
+                module = module.rpartition(".")[0]
+            level = self._min_levels[name] = self.levels[module]
+        return level
+
+    def enabled(self, level: str, name: str) -> bool:
+        """Будет ли записана строка: для дорогих сообщений проверять заранее"""
+        return logger.level(level).no >= self.min_level(name)
+
+    def is_sampled(self, name: str) -> bool:
+        sampled = self._sampled_names.get(name)
+        if sampled is None:
+            sampled = self._sampled_names[name] = any(
+                name == module or name.startswith(module + ".")
+                for module in self.sample_modules
+            )
+        return sampled
+
+    def _sample(self, record) -> bool:
+        site = (record["name"], record["line"])
+        second = int(time.monotonic())
+        window = self._windows.get(site)
+        if window is None or window[0] != second:
+            dropped = window[2] if window else 0
+            window = self._windows[site] = [second, 0, dropped]
+        if window[1] >= self.rate:
+            window[2] += 1
+            return False
+        window[1] += 1
+        if window[2]:
+            # Сколько таких строк пропущено с прошлой записанной
+            record["extra"]["dropped"] = window[2]
+            window[2] = 0
+        return True
+
+    def __call__(self, record) -> bool:
+        # Один и тот же record проходит через фильтры всех синков
+        if self._last[0] is record:
+            return self._last[1]
+        name = record["name"] or ""
+        # Медленные запросы пишутся только в свой лог
+        keep = (
+            record["level"].no >= self.min_level(name)
+            and "slow_query" not in record["extra"]
+        )
+        if keep and self.rate and record["level"].no <= INFO_LEVEL:
+            if record["extra"].get("sample") or self.is_sampled(name):
+                keep = self._sample(record)
+        self._last = (record, keep)
+        return keep
+
+
+log_filter = LogFilter(LOG_LEVEL, LOG_LEVELS, LOG_SAMPLE_MODULES, LOG_SAMPLE_RATE)
+
 # Получение имени текущей директории
 current_directory_name = os.path.basename(os.getcwd())
 
-os.makedirs(".", exist_ok=True)  # Создание папки logs, если её нет
-
 log_file_path = os.path.join(
     "logs", f"{current_directory_name}_{{time:YYYY-MM-DD}}.log"
 )
+slow_query_log_path = os.path.join("logs", "slow_queries_{time:YYYY-MM-DD}.log")
 
-
+# Все синки асинхронные (enqueue): запись в файл идет в отдельном потоке и не
+# блокирует обработчики; в воркерах gunicorn записи уходят через очередь мастеру
+logger.remove()
+logger.add(
+    sys.stderr,
+    format=TEXT_FORMAT,
+    filter=log_filter,
+    level=log_filter.lowest,
+    enqueue=True,
+)
 # Настройка ротации логов
 logger.add(
     log_file_path,  # Файл лога будет называться по дате и сохраняться в поддиректории с названием текущей директории
     rotation="00:00",  # Ротация каждый день в полночь
     retention="7 days",  # Хранение логов за последние 7 дней
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",  # Формат сообщений в файле
-    level="DEBUG",  # Минимальный уровень логирования
+    format=TEXT_FORMAT,
+    serialize=LOG_FORMAT == "json",  # JSON со всеми полями записи, включая extra
+    filter=log_filter,
+    level=log_filter.lowest,
+    enqueue=True,
     compression="zip",  # Архивирование старых логов
 )
+# Отдельный лог медленных SQL-запросов и их планов (см. slow_query.py)
+logger.add(
+    slow_query_log_path,
+    rotation="00:00",
+    retention="7 days",
+    format=TEXT_FORMAT,
+    serialize=LOG_FORMAT == "json",
+    filter=lambda record: "slow_query" in record["extra"],
+    enqueue=True,
+    compression="zip",
+)
@@ -1,24 +1,122 @@
 import os
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from loguru import logger
 from sqlalchemy.exc import SQLAlchemyError
+from replicas import DATABASE_REPLICA_URLS, ReplicaRouter
+from metrics import instrument_engine, pool_class
+from slow_query import slow_query_log
 
 Base = declarative_base()
 
+# Настройки пула соединений, общего для всего процесса
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 5))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", 10))
+DATABASE_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", 30))
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", 1800))
+DATABASE_POOL_PRE_PING = os.getenv("DATABASE_POOL_PRE_PING", "true").lower() in (
+    "1",
+    "true",
+)
+
+_engine: Optional[AsyncEngine] = None
+_replicas: Optional[ReplicaRouter] = None
+
+
+def create_engine(url: str, name: str = "primary") -> AsyncEngine:
+    """Движок с пулом и замерами для метрик; name - метка database в метриках"""
+    engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=pool_class(name),
+        pool_size=DATABASE_POOL_SIZE,
+        max_overflow=DATABASE_MAX_OVERFLOW,
+        pool_timeout=DATABASE_POOL_TIMEOUT,
+        pool_recycle=DATABASE_POOL_RECYCLE,
+        pool_pre_ping=DATABASE_POOL_PRE_PING,
+    )
+    instrument_engine(engine, name)
+    slow_query_log.instrument(engine, name)
+    return engine
+
+
+def get_engine() -> AsyncEngine:
+    """Единственный движок (и пул соединений) на процесс"""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(os.getenv("DATABASE_URL"))
+    return _engine
+
+
+def get_replicas() -> ReplicaRouter:
+    """Пулы реплик для чтения, тоже общие для процесса"""
+    global _replicas
+    if _replicas is None:
+        _replicas = ReplicaRouter(
+            [
+                create_engine(url, f"replica{index}")
+                for index, url in enumerate(DATABASE_REPLICA_URLS)
+            ]
+        )
+    return _replicas
+
 
 class Database:
     def __init__(self):
-        self.engine = create_async_engine(os.getenv("DATABASE_URL"), echo=False)
+        self.engine = get_engine()
+        self.replicas = get_replicas()
+        # Сессия берет соединение из пула только при первом запросе,
+        # поэтому отклоненный по токену запрос соединение не занимает
         self.SessionLocal = sessionmaker(
             autocommit=False, autoflush=False, bind=self.engine, class_=AsyncSession
         )
 
+    def pool_stats(self) -> dict:
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": DATABASE_MAX_OVERFLOW,
+            "timeout": DATABASE_POOL_TIMEOUT,
+        }
+
+    async def dispose(self):
+        """Закрытие всех соединений пула при остановке процесса"""
+        global _engine, _replicas
+        await self.replicas.stop()
+        await self.engine.dispose()
+        if _engine is self.engine:
+            _engine = None
+        if _replicas is self.replicas:
+            _replicas = None
+
+    def after_fork(self):
+        """Сброс унаследованных от родительского процесса соединений после fork"""
+        self.engine.sync_engine.dispose(close=False)
+        for replica in self.replicas.replicas:
+            replica.engine.sync_engine.dispose(close=False)
+
+    def read_sessionmaker(self, use_primary: bool = False):
+        """Фабрика сессий для чтения: реплика по кругу или primary"""
+        replica = None if use_primary else self.replicas.pick()
+        return replica.SessionLocal if replica is not None else self.SessionLocal
+
+    async def get_read_session(self, use_primary: bool = False):
+        try:
+            async with self.read_sessionmaker(use_primary)() as session:
+                yield session
+        except SQLAlchemyError as e:
+            logger.error(f"Ошибка при создании сессии: {e}")
+            raise e
+
     async def get_session(self):
         try:
             async with self.SessionLocal() as session:
-                logger.info("Создание сессии для работы с базой данных")
+                logger.debug("Создание сессии для работы с базой данных")
                 yield session
         except SQLAlchemyError as e:  # чтобы мы не поймали ошибку от роутеров
             logger.error(f"Ошибка при создании сессии: {e}")
@@ -57,3 +155,6 @@ class Database:
         except Exception as e:
             logger.error(f"Ошибка при очистке базы данных: {e}")
             raise e
+
+
+db = Database()
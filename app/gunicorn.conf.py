@@ -0,0 +1,72 @@
+"""Настройки gunicorn для продакшен-запуска (см. server.py)"""
+
+import os
+import glob
+from dotenv import load_dotenv
+from loguru import logger
+from server import SERVER_GRACEFUL_TIMEOUT
+
+# .env читается до приложения, чтобы значения по умолчанию ниже его не перекрывали
+load_dotenv()
+
+bind = f"{os.getenv('HOST_APP', '0.0.0.0')}:{os.getenv('PORT_APP', 8000)}"
+# Несколько воркеров включаются явно: WORKERS_APP=0 - по воркеру на ядро
+workers = int(os.getenv("WORKERS_APP", 1)) or os.cpu_count() or 1
+worker_class = "server.AppWorker"
+# Приложение импортируется один раз в мастере, воркеры получают его через fork
+preload_app = True
+# SIGTERM: воркер перестает принимать соединения и дожидается активных запросов
+graceful_timeout = SERVER_GRACEFUL_TIMEOUT
+timeout = int(os.getenv("SERVER_WORKER_TIMEOUT", 60))
+keepalive = int(os.getenv("SERVER_KEEPALIVE", 5))
+
+# Счетчики лимитов и кэши в памяти у каждого воркера свои: лимиты умножаются
+# на число воркеров, а после записи другие воркеры отдают устаревшие данные.
+# Приложение импортируется после чтения конфигурации, поэтому значения по
+# умолчанию меняются через окружение.
+if workers > 1:
+    os.environ.setdefault("RATE_LIMIT_STORAGE_URI", "shm://notes-ratelimit")
+    os.environ.setdefault("CACHE_BACKEND", "none")
+    # Отметки read-your-writes должны видеть все воркеры, иначе чтение сразу
+    # после записи может уйти в реплику из другого воркера
+    os.environ.setdefault(
+        "DATABASE_READ_YOUR_WRITES_BACKEND",
+        "redis" if os.environ["CACHE_BACKEND"] == "redis" else "shm",
+    )
+    if os.environ["RATE_LIMIT_STORAGE_URI"].startswith("memory://"):
+        logger.warning(
+            f"RATE_LIMIT_STORAGE_URI=memory:// при {workers} воркерах: "
+            "лимиты считаются отдельно в каждом воркере"
+        )
+    if os.environ["CACHE_BACKEND"] == "memory":
+        logger.warning(
+            f"CACHE_BACKEND=memory при {workers} воркерах: после записи "
+            "воркеры отдают устаревшие заметки до CACHE_TTL"
+        )
+    if (
+        os.getenv("DATABASE_REPLICA_URLS")
+        and os.environ["DATABASE_READ_YOUR_WRITES_BACKEND"] == "memory"
+    ):
+        logger.warning(
+            f"DATABASE_READ_YOUR_WRITES_BACKEND=memory при {workers} воркерах: "
+            "чтение сразу после записи может уйти в отстающую реплику"
+        )
+
+# Файлы метрик прошлого запуска удаляются до загрузки приложения
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+
+
+def post_fork(server, worker):
+    # Пулы соединений, созданные в мастере, воркеру использовать нельзя
+    from database import db
+
+    db.after_fork()
+
+
+def child_exit(server, worker):
+    from metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
@@ -0,0 +1,115 @@
+"""Хэширование паролей вне event loop.
+
+bcrypt занимает 100-300 мс процессорного времени на вызов. Если выполнять
+его прямо в обработчике, на это время останавливаются все запросы воркера.
+Поэтому хэширование выполняется в отдельном пуле с ограничением числа
+одновременных вызовов и очередью ограниченной длины.
+
+По умолчанию используется пул процессов: бэкенд passlib os_crypt (когда не
+установлен пакет bcrypt) не отпускает GIL, и пул потоков loop не разгрузит.
+"""
+
+import os
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from passlib.context import CryptContext
+
+
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process")
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1))
+)
+# Сколько вызовов может ждать свободного исполнителя, 0 - без ограничения
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 100))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+class HashQueueFull(Exception):
+    """Очередь на хэширование переполнена"""
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        executor: str = PASSWORD_HASH_EXECUTOR,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+    ):
+        if executor not in ("process", "thread"):
+            raise ValueError(f"Неизвестный тип пула хэширования: {executor}")
+        self.executor_type = executor
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._semaphore = asyncio.Semaphore(workers)
+        self.active = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        # Пул создается при первом вызове, а не при импорте модуля
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def run(self, func, *args):
+        """Выполнение func в пуле; HashQueueFull, если очередь переполнена"""
+        if self.max_queue and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HashQueueFull()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.active -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(_verify, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(_hash, password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
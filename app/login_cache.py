@@ -0,0 +1,106 @@
+"""Кэш входа по telegram_id.
+
+Бот вызывает /login_by_telegram_id на каждое сообщение, поэтому кэшируются
+соответствие telegram_id -> user_id (в том числе отсутствие пользователя)
+и недавно выпущенный токен: он отдается повторно, пока у него остается
+большая часть срока жизни.
+
+Используется тот же бэкенд, что и у кэша заметок (CACHE_BACKEND).
+"""
+
+import os
+from typing import Awaitable, Callable, Optional
+from loguru import logger
+from cache import create_backend
+
+
+LOGIN_CACHE_TTL = int(os.getenv("LOGIN_CACHE_TTL", 300))
+# Токен выдается повторно, пока до exp остается не меньше этой доли срока жизни
+LOGIN_TOKEN_REUSE_RATIO = float(os.getenv("LOGIN_TOKEN_REUSE_RATIO", 0.5))
+
+
+class LoginCache:
+    def __init__(
+        self,
+        backend=None,
+        ttl: int = LOGIN_CACHE_TTL,
+        reuse_ratio: float = LOGIN_TOKEN_REUSE_RATIO,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.reuse_ratio = reuse_ratio
+        self.hits = 0
+        self.misses = 0
+        self.tokens_reused = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "tokens_reused": self.tokens_reused,
+        }
+
+    async def get_user_id(
+        self, telegram_id: int, loader: Callable[[], Awaitable[Optional[int]]]
+    ) -> Optional[int]:
+        """user_id по telegram_id из кэша или через loader; None - нет пользователя"""
+        if not self.enabled:
+            return await loader()
+        key = f"tg:{telegram_id}"
+        try:
+            cached = await self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Ошибка чтения из кэша: {e}")
+            return await loader()
+        if cached is not None:
+            self.hits += 1
+            return cached["user_id"]
+        self.misses += 1
+        user_id = await loader()
+        try:
+            await self.backend.set(key, {"user_id": user_id}, self.ttl)
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш: {e}")
+        return user_id
+
+    async def get_token(self, user_id: int) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            token = await self.backend.get(f"tg_token:{user_id}")
+        except Exception as e:
+            logger.error(f"Ошибка чтения из кэша: {e}")
+            return None
+        if token is not None:
+            self.tokens_reused += 1
+        return token
+
+    async def set_token(self, user_id: int, token: str, lifetime: int):
+        """Запись токена на ту часть lifetime, пока его можно выдавать повторно"""
+        ttl = int(lifetime * (1 - self.reuse_ratio))
+        if not self.enabled or ttl <= 0:
+            return
+        try:
+            await self.backend.set(f"tg_token:{user_id}", token, ttl)
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш: {e}")
+
+    async def invalidate(self, *telegram_ids: Optional[int]):
+        """Сброс соответствия после регистрации или смены telegram_id"""
+        if not self.enabled:
+            return
+        try:
+            for telegram_id in telegram_ids:
+                if telegram_id is not None:
+                    await self.backend.delete(f"tg:{telegram_id}")
+        except Exception as e:
+            logger.error(f"Ошибка инвалидации кэша telegram_id: {e}")
+
+
+login_cache = LoginCache(create_backend())
@@ -1,38 +1,67 @@
 import config
 import os
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
 from loguru import logger
 from api import user, note
-from database import Database
+from database import db
+from migrations import check_schema_version
+from token_cache import token_cache
+from hashing import password_hasher
+from rate_limit import limiter
 from slowapi.errors import RateLimitExceeded
+import metrics
+from slow_query import slow_query_log
 
 
 app = FastAPI()
-
-# Инициализация базы данных
-db = Database()
+app.state.limiter = limiter
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 @app.on_event("startup")
 async def on_startup():
     logger.info("Запуск приложения...")
-    await db.init_db()
+    # Схему меняют только миграции (python -m migrations upgrade)
+    await check_schema_version(db.engine)
+    db.replicas.start_health_checks()
 
 
 @app.on_event("shutdown")
 async def on_shutdown():
     logger.info("Выключение приложения...")
+    logger.info(f"Кэш токенов: {token_cache.stats()}")
+    logger.info(f"Пул хэширования паролей: {password_hasher.stats()}")
+    password_hasher.shutdown()
+    logger.info(f"Пул соединений с базой данных: {db.pool_stats()}")
+    if db.replicas:
+        logger.info(f"Реплики: {db.replicas.stats()}")
+    if slow_query_log.groups:
+        logger.info(f"Медленные запросы: {slow_query_log.stats()}")
+    await db.dispose()
+    await logger.complete()
 
 
 @app.exception_handler(RateLimitExceeded)
 async def rate_limit_error(request, exc):
+    metrics.RATE_LIMITED.labels(metrics.route_name(request.scope)).inc()
     return JSONResponse(
         status_code=429,
         content={"detail": "Превышено чилсо запросов в минуту"},
     )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    client_host = request.client.host if request.client else ""
+    if not metrics.scrape_allowed(
+        client_host, request.headers.get("authorization", "")
+    ):
+        # 404, а не 403: посторонним не видно, что эндпоинт существует
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
 # Подключение роутеров
 app.include_router(user.router, prefix="/api")
 app.include_router(note.router, prefix="/api")
@@ -0,0 +1,208 @@
+"""Метрики Prometheus, отдаются в текстовом формате на GET /metrics.
+
+- время ответа и число ответов по маршрутам (шаблон пути, а не сам путь,
+  чтобы id заметок не размножали ряды) и статусам;
+- отказы ограничителя частоты запросов;
+- ожидание соединения из пула, занятые и сверхлимитные (overflow) соединения;
+- время выполнения SQL-выражений по событиям движка.
+
+Под gunicorn у каждого воркера свои счетчики. Чтобы /metrics отдавал сумму
+по всем воркерам, задайте PROMETHEUS_MULTIPROC_DIR - пустой каталог, общий
+для процессов (очищается при каждом запуске).
+
+/metrics открыт только для адресов из METRICS_ALLOWED_NETWORKS (по умолчанию
+локальные) или по заголовку Authorization: Bearer <METRICS_TOKEN>: метрики
+раскрывают маршруты и состояние пула соединений.
+"""
+
+import os
+import time
+import hmac
+import ipaddress
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# Сети через запятую, из которых /metrics доступен без токена
+METRICS_ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network.strip())
+    for network in os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.0/8,::1/128").split(
+        ","
+    )
+    if network.strip()
+]
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+# Команды SQL, которые попадают в метку operation, остальные - OTHER
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT"}
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route"],
+)
+REQUESTS = Counter(
+    "http_requests_total", "Число HTTP-ответов", ["method", "route", "status"]
+)
+RATE_LIMITED = Counter(
+    "rate_limit_rejections_total", "Запросы, отклоненные по частоте", ["route"]
+)
+DB_STATEMENT_LATENCY = Histogram(
+    "db_statement_duration_seconds",
+    "Время выполнения SQL-выражения",
+    ["database", "operation"],
+    buckets=DB_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Ожидание соединения из пула",
+    ["database"],
+    buckets=DB_BUCKETS + (10, 30),
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Соединения, выданные из пула",
+    ["database"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Соединения сверх pool_size",
+    ["database"],
+    multiprocess_mode="livesum",
+)
+
+
+def route_name(scope) -> str:
+    """Шаблон пути маршрута, например /api/notes/{note_id}"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: время и статус каждого HTTP-запроса"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Для потоковых ответов время считается до последнего фрагмента
+            route = route_name(scope)
+            REQUEST_LATENCY.labels(scope["method"], route).observe(
+                time.perf_counter() - start
+            )
+            REQUESTS.labels(scope["method"], route, status).inc()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет ожидание соединения и обновляет гауги"""
+
+    database = "primary"
+
+    def _update_gauges(self):
+        DB_POOL_IN_USE.labels(self.database).set(self.checkedout())
+        DB_POOL_OVERFLOW.labels(self.database).set(max(self.overflow(), 0))
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.database).observe(
+                time.perf_counter() - start
+            )
+            self._update_gauges()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+
+_pool_classes = {}
+
+
+def pool_class(database: str):
+    """Класс пула с меткой database; сохраняется при пересоздании пула"""
+    if database not in _pool_classes:
+        _pool_classes[database] = type(
+            "InstrumentedPool", (InstrumentedPool,), {"database": database}
+        )
+    return _pool_classes[database]
+
+
+def sql_operation(statement: str) -> str:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+    return operation if operation in SQL_OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, database: str):
+    """Замер каждого SQL-выражения через before/after_cursor_execute"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, params, context, executemany):
+        if context is not None:
+            context.metrics_start = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, params, context, executemany):
+        start = getattr(context, "metrics_start", None)
+        if start is not None:
+            DB_STATEMENT_LATENCY.labels(database, sql_operation(statement)).observe(
+                time.perf_counter() - start
+            )
+
+
+def scrape_allowed(client_host: str, authorization: str) -> bool:
+    """Доступ к /metrics: адрес клиента из разрешенных сетей или верный токен"""
+    if METRICS_TOKEN and hmac.compare_digest(
+        authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()
+    ):
+        return True
+    try:
+        address = ipaddress.ip_address(client_host)
+    except ValueError:
+        return False
+    return any(address in network for network in METRICS_ALLOWED_NETWORKS)
+
+
+def render() -> bytes:
+    """Текст метрик: всего процесса или, в multiprocess-режиме, всех воркеров"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: int):
+    """Удаление гаугов завершившегося воркера (хук gunicorn child_exit)"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
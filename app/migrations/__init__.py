@@ -0,0 +1,178 @@
+"""Версионные миграции схемы базы данных.
+
+Каждая миграция - модуль migrations/versions/vNNNN_*.py с атрибутами:
+    VERSION: int - порядковый номер миграции
+    DESCRIPTION: str - краткое описание
+    TRANSACTIONAL: bool - выполнять ли upgrade в транзакции. Для
+        CREATE INDEX CONCURRENTLY и пакетных обновлений нужен False:
+        такие миграции получают соединение в режиме AUTOCOMMIT
+    async def upgrade(conn: AsyncConnection)
+
+Миграции обязаны быть идемпотентными (IF NOT EXISTS и т.п.): нетранзакционная
+миграция, прерванная на середине, будет выполнена повторно целиком.
+"""
+
+import asyncio
+import importlib
+import pkgutil
+from types import ModuleType
+from typing import List
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from migrations import versions
+
+# Произвольный ключ advisory lock, чтобы миграции не запускались параллельно
+MIGRATION_LOCK_KEY = 724316001
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def get_migrations() -> List[ModuleType]:
+    """Все миграции из пакета versions, отсортированные по VERSION"""
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+        if info.name.startswith("v")
+    ]
+    return sorted(modules, key=lambda module: module.VERSION)
+
+
+def head_version() -> int:
+    migrations = get_migrations()
+    return migrations[-1].VERSION if migrations else 0
+
+
+async def create_index_concurrently(conn: AsyncConnection, name: str, definition: str):
+    """CREATE INDEX CONCURRENTLY с удалением невалидного индекса от прошлой попытки.
+
+    definition - часть после имени индекса, например "ON notes (user_id)".
+    Соединение должно быть в режиме AUTOCOMMIT.
+    """
+    result = await conn.execute(
+        text(
+            "SELECT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+        ),
+        {"name": name},
+    )
+    valid = result.scalar()
+    if valid is False:
+        logger.warning(f"Индекс {name} невалиден после прерванной сборки, пересоздаем")
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    logger.info(f"Создание индекса {name}...")
+    await conn.execute(
+        text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}")
+    )
+
+
+async def backfill(
+    conn: AsyncConnection,
+    table: str,
+    assignments: str,
+    pending: str,
+    batch_size: int = 1000,
+    retry_delay: float = 0.5,
+):
+    """Заполнение колонки пакетами по batch_size строк, каждый пакет - своя транзакция.
+
+    pending - условие на строки, которые еще не заполнены; по нему же
+    определяется окончание. Соединение должно быть в режиме AUTOCOMMIT.
+    """
+    statement = text(
+        f"UPDATE {table} SET {assignments} WHERE id IN "
+        f"(SELECT id FROM {table} WHERE {pending} LIMIT :batch_size "
+        f"FOR UPDATE SKIP LOCKED)"
+    )
+    remaining = text(f"SELECT EXISTS (SELECT 1 FROM {table} WHERE {pending})")
+    total = 0
+    while True:
+        result = await conn.execute(statement, {"batch_size": batch_size})
+        if result.rowcount:
+            total += result.rowcount
+            logger.info(f"Заполнено {total} строк таблицы {table}")
+            continue
+        # SKIP LOCKED пропускает строки, заблокированные приложением: пустой
+        # пакет еще не значит, что незаполненных строк не осталось
+        if not (await conn.execute(remaining)).scalar():
+            return total
+        await asyncio.sleep(retry_delay)
+
+
+async def _ensure_version_table(conn: AsyncConnection):
+    await conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+        )
+    )
+
+
+async def current_version(conn: AsyncConnection) -> int:
+    exists = await conn.execute(text("SELECT to_regclass('schema_version')"))
+    if exists.scalar() is None:
+        return 0
+    result = await conn.execute(text("SELECT max(version) FROM schema_version"))
+    return result.scalar() or 0
+
+
+async def upgrade(engine: AsyncEngine):
+    """Применение всех миграций новее текущей версии схемы"""
+    async with engine.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        await lock_conn.execute(
+            text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+        )
+        try:
+            await _ensure_version_table(lock_conn)
+            version = await current_version(lock_conn)
+            pending = [m for m in get_migrations() if m.VERSION > version]
+            if not pending:
+                logger.info(f"Схема базы данных актуальна (версия {version})")
+                return
+            for migration in pending:
+                await _apply(engine, migration)
+        finally:
+            await lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY}
+            )
+
+
+async def _apply(engine: AsyncEngine, migration: ModuleType):
+    logger.info(f"Применение миграции {migration.VERSION}: {migration.DESCRIPTION}")
+    record = text(
+        "INSERT INTO schema_version (version, description) VALUES (:version, :description)"
+    )
+    params = {"version": migration.VERSION, "description": migration.DESCRIPTION}
+    try:
+        if migration.TRANSACTIONAL:
+            async with engine.begin() as conn:
+                await migration.upgrade(conn)
+                await conn.execute(record, params)
+        else:
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await migration.upgrade(conn)
+                await conn.execute(record, params)
+    except Exception as e:
+        logger.error(f"Ошибка при применении миграции {migration.VERSION}: {e}")
+        raise e
+    logger.info(f"Миграция {migration.VERSION} применена")
+
+
+async def check_schema_version(engine: AsyncEngine):
+    """Проверка при старте приложения: схема должна быть не старше кода"""
+    async with engine.connect() as conn:
+        version = await current_version(conn)
+    head = head_version()
+    if version < head:
+        raise SchemaVersionError(
+            f"Схема базы данных устарела: версия {version}, требуется {head}. "
+            "Выполните python -m migrations upgrade"
+        )
+    logger.info(f"Версия схемы базы данных: {version}")
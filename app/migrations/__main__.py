@@ -0,0 +1,28 @@
+"""Запуск миграций: python -m migrations [upgrade|current]"""
+
+import config
+import asyncio
+import sys
+from loguru import logger
+from database import db
+import migrations
+
+
+async def main(command: str):
+    try:
+        if command == "upgrade":
+            await migrations.upgrade(db.engine)
+        elif command == "current":
+            async with db.engine.connect() as conn:
+                version = await migrations.current_version(conn)
+            logger.info(
+                f"Текущая версия схемы: {version}, последняя: {migrations.head_version()}"
+            )
+        else:
+            raise SystemExit(f"Неизвестная команда: {command}")
+    finally:
+        await db.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "upgrade"))
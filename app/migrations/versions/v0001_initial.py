@@ -0,0 +1,45 @@
+"""Исходная схема: таблицы users и notes в том виде, как их создавал create_all"""
+
+from sqlalchemy import text
+
+VERSION = 1
+DESCRIPTION = "Таблицы users и notes"
+TRANSACTIONAL = True
+
+
+async def upgrade(conn):
+    await conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id SERIAL PRIMARY KEY,
+                username VARCHAR,
+                hashed_password VARCHAR,
+                telegram_id INTEGER UNIQUE
+            )
+            """
+        )
+    )
+    await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)"))
+    await conn.execute(
+        text("CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username ON users (username)")
+    )
+    await conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS notes (
+                id SERIAL PRIMARY KEY,
+                title VARCHAR,
+                content VARCHAR,
+                tags VARCHAR[],
+                created_at TIMESTAMP WITHOUT TIME ZONE,
+                updated_at TIMESTAMP WITHOUT TIME ZONE,
+                user_id INTEGER NOT NULL REFERENCES users (id)
+            )
+            """
+        )
+    )
+    await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_notes_id ON notes (id)"))
+    await conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_notes_title ON notes (title)")
+    )
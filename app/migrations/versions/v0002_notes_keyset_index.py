@@ -0,0 +1,13 @@
+"""Составной индекс под keyset-пагинацию списка заметок"""
+
+from migrations import create_index_concurrently
+
+VERSION = 2
+DESCRIPTION = "Индекс notes (user_id, updated_at, id)"
+TRANSACTIONAL = False
+
+
+async def upgrade(conn):
+    await create_index_concurrently(
+        conn, "ix_notes_user_id_updated_at_id", "ON notes (user_id, updated_at, id)"
+    )
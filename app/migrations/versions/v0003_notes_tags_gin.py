@@ -0,0 +1,11 @@
+"""GIN-индекс по тегам для операторов @> и &&"""
+
+from migrations import create_index_concurrently
+
+VERSION = 3
+DESCRIPTION = "GIN-индекс notes.tags"
+TRANSACTIONAL = False
+
+
+async def upgrade(conn):
+    await create_index_concurrently(conn, "ix_notes_tags", "ON notes USING gin (tags)")
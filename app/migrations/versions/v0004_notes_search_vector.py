@@ -0,0 +1,52 @@
+"""Колонка search_vector для полнотекстового поиска.
+
+Генерируемая STORED-колонка переписала бы всю таблицу под эксклюзивной
+блокировкой, поэтому колонка обычная: ее поддерживает триггер, существующие
+строки заполняются пакетами, индекс строится конкурентно.
+"""
+
+from sqlalchemy import text
+from migrations import backfill, create_index_concurrently
+from models.note import SEARCH_VECTOR_EXPRESSION
+
+VERSION = 4
+DESCRIPTION = "Колонка notes.search_vector, триггер и GIN-индекс"
+TRANSACTIONAL = False
+
+
+async def upgrade(conn):
+    # Добавление nullable-колонки без значения по умолчанию не переписывает таблицу
+    await conn.execute(
+        text("ALTER TABLE notes ADD COLUMN IF NOT EXISTS search_vector tsvector")
+    )
+    await conn.execute(
+        text(
+            f"""
+            CREATE OR REPLACE FUNCTION notes_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {SEARCH_VECTOR_EXPRESSION.format(row="NEW.")};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+    )
+    await conn.execute(
+        text("DROP TRIGGER IF EXISTS notes_search_vector_trigger ON notes")
+    )
+    await conn.execute(
+        text(
+            "CREATE TRIGGER notes_search_vector_trigger "
+            "BEFORE INSERT OR UPDATE OF title, content ON notes "
+            "FOR EACH ROW EXECUTE FUNCTION notes_search_vector_update()"
+        )
+    )
+    await backfill(
+        conn,
+        "notes",
+        f"search_vector = {SEARCH_VECTOR_EXPRESSION.format(row='')}",
+        "search_vector IS NULL",
+    )
+    await create_index_concurrently(
+        conn, "ix_notes_search_vector", "ON notes USING gin (search_vector)"
+    )
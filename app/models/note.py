@@ -1,6 +1,28 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, ARRAY
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    ForeignKey,
+    Index,
+    DDL,
+    FetchedValue,
+    event,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import deferred
 from database import Base
 
+# Конфигурация полнотекстового поиска PostgreSQL (стемминг русских и английских слов).
+# Запросы и триггер должны использовать одну конфигурацию: после ее смены нужна
+# миграция, которая пересоздает функцию триггера и пересчитывает search_vector
+SEARCH_CONFIG = "russian"
+# Выражение для search_vector; {row} - "NEW." в триггере или "" в UPDATE
+SEARCH_VECTOR_EXPRESSION = (
+    f"to_tsvector('{SEARCH_CONFIG}', "
+    "coalesce({row}title, '') || ' ' || coalesce({row}content, ''))"
+)
+
 
 class NoteModel(Base):
     __tablename__ = "notes"
@@ -14,3 +36,40 @@ class NoteModel(Base):
 
     # Добавляем поле user_id с внешним ключом на таблицу пользователей
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    # Хранимый tsvector по заголовку и содержимому для полнотекстового поиска,
+    # заполняется триггером (см. миграцию v0004). Отложенная загрузка:
+    # в обычных выборках заметок колонка не нужна
+    search_vector = deferred(
+        Column(TSVECTOR, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    )
+
+    __table_args__ = (
+        # Индекс под keyset-пагинацию списка заметок пользователя
+        Index("ix_notes_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        # GIN-индекс для операторов @> и && по тегам
+        Index("ix_notes_tags", "tags", postgresql_using="gin"),
+        Index("ix_notes_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+
+# Триггер для таблиц, созданных через Base.metadata.create_all (тесты, локальная
+# разработка). В рабочей базе он создается миграцией v0004
+for statement in (
+    f"""
+    CREATE OR REPLACE FUNCTION notes_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_VECTOR_EXPRESSION.format(row="NEW.")};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "CREATE TRIGGER notes_search_vector_trigger "
+    "BEFORE INSERT OR UPDATE OF title, content ON notes "
+    "FOR EACH ROW EXECUTE FUNCTION notes_search_vector_update()",
+):
+    event.listen(
+        NoteModel.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
@@ -0,0 +1,242 @@
+"""Единый ограничитель частоты запросов для всех роутеров.
+
+Хранилище счетчиков задается RATE_LIMIT_STORAGE_URI:
+    memory://              - в памяти процесса (только для одного воркера)
+    shm://notes-ratelimit  - общее для процессов одного хоста: SQLite в /dev/shm
+    redis://host:6379/0    - общее для нескольких хостов (Redis или совместимый
+                             сервер, нужен пакет redis)
+
+Стратегия по умолчанию - moving-window (скользящее окно): в Redis проверка и
+запись выполняются одним Lua-скриптом, в shm - одной транзакцией
+BEGIN IMMEDIATE, поэтому лимит соблюдается атомарно для всех воркеров.
+slowapi вызывает хранилище синхронно в event loop, поэтому блокировку shm
+ждем не дольше RATE_LIMIT_SHM_TIMEOUT секунд, а затем пропускаем запрос без
+учета (fail open): занятая другим воркером блокировка не останавливает все
+запросы этого воркера.
+
+Лимиты маршрутов переопределяются в RATE_LIMITS (JSON) по имени функции
+эндпоинта, например: {"login_for_access_token": "5/minute"}.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import tempfile
+from typing import Optional, Tuple
+from limits.storage import MovingWindowSupport, Storage
+from loguru import logger
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "moving-window")
+RATE_LIMITS = json.loads(os.getenv("RATE_LIMITS", "{}"))
+RATE_LIMIT_SHM_TIMEOUT = float(os.getenv("RATE_LIMIT_SHM_TIMEOUT", 0.05))
+
+
+class SharedMemoryStorage(Storage, MovingWindowSupport):
+    """Хранилище limits в SQLite-файле на tmpfs, общее для процессов хоста.
+
+    shm://name - файл /dev/shm/name.sqlite (или во временном каталоге, если
+    /dev/shm нет); shm:///path/to/file - явный путь.
+    """
+
+    STORAGE_SCHEME = ["shm"]
+    # Как часто (в вызовах) удалять истекшие записи всех ключей
+    CLEANUP_EVERY = 1000
+
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        wrap_exceptions: bool = False,
+        timeout: float = RATE_LIMIT_SHM_TIMEOUT,
+        **_,
+    ):
+        self.path = self._path_from_uri(uri or "shm://notes-ratelimit")
+        self.timeout = timeout
+        self.lock_timeouts = 0
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+        self._calls = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **_)
+
+    @staticmethod
+    def _path_from_uri(uri: str) -> str:
+        location = uri.split("://", 1)[1]
+        if location.startswith("/"):
+            return location
+        directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        return os.path.join(directory, f"{location or 'notes-ratelimit'}.sqlite")
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # После fork соединение родителя использовать нельзя
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS counters "
+                "(key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS events "
+                "(key TEXT NOT NULL, at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_events_key_at ON events (key, at)"
+            )
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def _transaction(self, fail_open: bool = True) -> Optional[sqlite3.Connection]:
+        """Блокировка на запись сразу: проверка и изменение атомарны между процессами.
+
+        None - блокировку не удалось получить за timeout (при fail_open).
+        """
+        connection = self.connection
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            if not fail_open:
+                raise
+            self.lock_timeouts += 1
+            logger.bind(sample=True).info(
+                f"Хранилище лимитов занято, запрос пропущен без учета: {e}"
+            )
+            return None
+        self._calls += 1
+        if self._calls % self.CLEANUP_EVERY == 0:
+            now = time.time()
+            connection.execute("DELETE FROM events WHERE expires_at < ?", (now,))
+            connection.execute("DELETE FROM counters WHERE expires_at < ?", (now,))
+        return connection
+
+    def incr(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> int:
+        with self.lock:
+            connection = self._transaction()
+            if connection is None:
+                return 0
+            try:
+                now = time.time()
+                row = connection.execute(
+                    "SELECT value, expires_at FROM counters WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or row[1] <= now:
+                    value, expires_at = amount, now + expiry
+                else:
+                    value = row[0] + amount
+                    expires_at = now + expiry if elastic_expiry else row[1]
+                connection.execute(
+                    "INSERT OR REPLACE INTO counters (key, value, expires_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            return value
+
+    def get(self, key: str) -> int:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM counters WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> int:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT expires_at FROM counters WHERE key = ?", (key,)
+            ).fetchone()
+        return int(row[0] if row else time.time())
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        with self.lock:
+            connection = self._transaction()
+            if connection is None:
+                return True
+            try:
+                now = time.time()
+                connection.execute(
+                    "DELETE FROM events WHERE key = ? AND at < ?", (key, now - expiry)
+                )
+                (acquired,) = connection.execute(
+                    "SELECT count(*) FROM events WHERE key = ?", (key,)
+                ).fetchone()
+                allowed = acquired + amount <= limit
+                if allowed:
+                    connection.executemany(
+                        "INSERT INTO events (key, at, expires_at) VALUES (?, ?, ?)",
+                        [(key, now, now + expiry)] * amount,
+                    )
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            return allowed
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> Tuple[int, int]:
+        now = time.time()
+        with self.lock:
+            start, acquired = self.connection.execute(
+                "SELECT min(at), count(*) FROM events WHERE key = ? AND at >= ?",
+                (key, now - expiry),
+            ).fetchone()
+        return int(start if start is not None else now), acquired
+
+    def check(self) -> bool:
+        with self.lock:
+            self.connection.execute("SELECT 1")
+        return True
+
+    def reset(self) -> Optional[int]:
+        with self.lock:
+            connection = self._transaction(fail_open=False)
+            deleted = connection.execute("DELETE FROM counters").rowcount
+            deleted += connection.execute("DELETE FROM events").rowcount
+            connection.execute("COMMIT")
+        return deleted
+
+    def clear(self, key: str) -> None:
+        with self.lock:
+            connection = self._transaction(fail_open=False)
+            connection.execute("DELETE FROM counters WHERE key = ?", (key,))
+            connection.execute("DELETE FROM events WHERE key = ?", (key,))
+            connection.execute("COMMIT")
+
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    strategy=RATE_LIMIT_STRATEGY,
+    # Если общее хранилище недоступно, лимиты считаются в памяти воркера
+    in_memory_fallback_enabled=RATE_LIMIT_STORAGE_URI != "memory://",
+)
+
+
+def route_limit(default: str):
+    """limiter.limit с лимитом из RATE_LIMITS по имени эндпоинта или default"""
+
+    def decorator(func):
+        return limiter.limit(RATE_LIMITS.get(func.__name__, default))(func)
+
+    return decorator
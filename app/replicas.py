@@ -0,0 +1,183 @@
+"""Маршрутизация чтений на реплики базы данных.
+
+Реплики задаются в DATABASE_REPLICA_URLS через запятую. Читающие эндпоинты
+получают сессию реплики по кругу (round-robin) среди здоровых. Реплика
+считается недоступной после ошибки соединения и возвращается в ротацию
+фоновой проверкой SELECT 1. Если здоровых реплик нет, чтение идет в primary.
+
+Read-your-writes: после записи чтения пользователя в течение
+DATABASE_READ_YOUR_WRITES_WINDOW секунд идут в primary, чтобы не увидеть
+реплику, которая еще не догнала запись. Отметки о записях хранятся в бэкенде
+DATABASE_READ_YOUR_WRITES_BACKEND и должны быть общими для всех воркеров:
+shm - для воркеров одного хоста, redis - для нескольких хостов. При none
+отметок нет, и чтения пользователей при включенных репликах идут в primary.
+"""
+
+import os
+import time
+import asyncio
+from typing import List, Optional
+from loguru import logger
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from cache import CACHE_BACKEND
+
+
+DATABASE_REPLICA_URLS = [
+    url.strip()
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# Как долго недоступная реплика не получает запросы и как часто проверяются реплики
+DATABASE_REPLICA_HEALTH_INTERVAL = float(
+    os.getenv("DATABASE_REPLICA_HEALTH_INTERVAL", 5)
+)
+# Сколько секунд после записи читать из primary, 0 - сразу читать из реплик
+DATABASE_READ_YOUR_WRITES_WINDOW = int(os.getenv("DATABASE_READ_YOUR_WRITES_WINDOW", 5))
+# memory годится только для одного воркера; по умолчанию redis, если кэш в Redis
+DATABASE_READ_YOUR_WRITES_BACKEND = os.getenv(
+    "DATABASE_READ_YOUR_WRITES_BACKEND",
+    "redis" if CACHE_BACKEND == "redis" else "memory",
+)
+
+
+class Replica:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.SessionLocal = sessionmaker(
+            autocommit=False, autoflush=False, bind=engine, class_=AsyncSession
+        )
+        self.down_until = 0.0
+        self.failures = 0
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        engines: List[AsyncEngine],
+        health_interval: float = DATABASE_REPLICA_HEALTH_INTERVAL,
+        clock=time.monotonic,
+    ):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.health_interval = health_interval
+        self.clock = clock
+        self._next = 0
+        self._health_task: Optional[asyncio.Task] = None
+        for replica in self.replicas:
+            sync_engine = getattr(replica.engine, "sync_engine", None)
+            if sync_engine is not None:
+                event.listen(sync_engine, "do_connect", self._on_connect(replica))
+                event.listen(sync_engine, "handle_error", self._on_error(replica))
+
+    def __len__(self):
+        return len(self.replicas)
+
+    def _on_connect(self, replica: Replica):
+        def do_connect(dialect, connection_record, cargs, cparams):
+            # Ошибки установки соединения (например, OSError) не проходят
+            # через handle_error, поэтому соединение открывается здесь
+            try:
+                return dialect.connect(*cargs, **cparams)
+            except Exception as e:
+                self.mark_down(replica, e)
+                raise
+
+        return do_connect
+
+    def _on_error(self, replica: Replica):
+        def handle_error(context):
+            # Ошибки SQL не говорят о здоровье реплики, обрывы соединения - говорят
+            if context.is_disconnect:
+                self.mark_down(replica, context.original_exception)
+
+        return handle_error
+
+    def is_healthy(self, replica: Replica) -> bool:
+        return replica.down_until <= self.clock()
+
+    def pick(self) -> Optional[Replica]:
+        """Следующая здоровая реплика по кругу или None"""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if self.is_healthy(replica):
+                return replica
+        return None
+
+    def mark_down(self, replica: Replica, error: Exception = None):
+        if self.is_healthy(replica):
+            logger.warning(f"Реплика {replica.name} недоступна: {error}")
+        replica.failures += 1
+        replica.down_until = self.clock() + self.health_interval
+
+    async def check_health(self):
+        """SELECT 1 на каждой реплике; успешная проверка возвращает ее в ротацию"""
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except Exception as e:
+                self.mark_down(replica, e)
+                continue
+            if not self.is_healthy(replica):
+                logger.info(f"Реплика {replica.name} снова доступна")
+            replica.down_until = 0.0
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    def start_health_checks(self):
+        if self.replicas and self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> List[dict]:
+        return [
+            {
+                "replica": replica.name,
+                "healthy": self.is_healthy(replica),
+                "failures": replica.failures,
+            }
+            for replica in self.replicas
+        ]
+
+
+class RecentWrites:
+    """Отметки о недавних записях пользователя для read-your-writes.
+
+    Без бэкенда отметки не хранятся, и каждое чтение считается недавним.
+    """
+
+    def __init__(self, backend=None, window: int = DATABASE_READ_YOUR_WRITES_WINDOW):
+        self.backend = backend
+        self.window = window
+
+    async def mark(self, user_id: int):
+        if self.backend is None or self.window <= 0:
+            return
+        try:
+            await self.backend.set(f"rw:{user_id}", 1, self.window)
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш: {e}")
+
+    async def contains(self, user_id: int) -> bool:
+        """Была ли запись в пределах окна; при ошибке кэша безопаснее primary"""
+        if self.window <= 0:
+            return False
+        if self.backend is None:
+            return True
+        try:
+            return await self.backend.get(f"rw:{user_id}") is not None
+        except Exception as e:
+            logger.error(f"Ошибка чтения из кэша: {e}")
+            return True
@@ -1,3 +1,4 @@
+from enum import Enum
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
@@ -25,3 +26,53 @@ class NoteResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class NoteSearchResult(BaseModel):
+    id: int
+    title: str
+    tags: Optional[List[str]]
+    created_at: datetime
+    updated_at: datetime
+    rank: float
+    # Полное содержимое, либо фрагменты с подсветкой совпадений (highlight=true):
+    # HTML, где текст заметки экранирован, а совпадения обернуты в <b>...</b>
+    content: Optional[str] = None
+    snippet: Optional[str] = None
+
+
+class NoteBulkUpdate(NoteUpdate):
+    id: int
+
+
+class NoteBulkResult(BaseModel):
+    # Результат по одному элементу пакета: 200, либо 404 для чужой/несуществующей заметки
+    id: Optional[int] = None
+    status: int
+    note: Optional[NoteResponse] = None
+    detail: Optional[str] = None
+
+
+class NoteView(str, Enum):
+    full = "full"  # все поля заметки
+    summary = "summary"  # без content
+
+
+class NoteField(str, Enum):
+    id = "id"
+    title = "title"
+    content = "content"
+    tags = "tags"
+    created_at = "created_at"
+    updated_at = "updated_at"
+
+
+class NoteSummary(BaseModel):
+    # Проекция заметки: в ответ попадают только запрошенные поля
+    id: int
+    title: Optional[str] = None
+    content: Optional[str] = None
+    content_preview: Optional[str] = None
+    tags: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
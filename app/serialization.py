@@ -0,0 +1,64 @@
+"""Быстрая сериализация списков заметок.
+
+Строки Core-запроса превращаются в словари заранее собранным сериализатором
+и кодируются в JSON через orjson (если установлен) без ORM-объектов и без
+повторной валидации каждой строки Pydantic-моделью ответа.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Iterable, List, Sequence
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+
+DATETIME_FIELDS = ("created_at", "updated_at")
+
+
+def _default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON в том же виде, что и у JSONResponse FastAPI: компактно, UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class RowSerializer:
+    """Преобразование строк результата в JSON-совместимые словари.
+
+    Порядок ключей совпадает с порядком колонок в запросе; лишние колонки
+    в конце строки (например, updated_at для курсора) отбрасываются.
+    """
+
+    def __init__(self, keys: Sequence[str]):
+        self.keys = tuple(keys)
+        self._datetime_keys = [key for key in self.keys if key in DATETIME_FIELDS]
+
+    def __call__(self, row: Sequence[Any]) -> dict:
+        item = dict(zip(self.keys, row))
+        for key in self._datetime_keys:
+            value = item[key]
+            if value is not None:
+                item[key] = value.isoformat()
+        return item
+
+    def many(self, rows: Iterable[Sequence[Any]]) -> List[dict]:
+        return [self(row) for row in rows]
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
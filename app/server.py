@@ -0,0 +1,21 @@
+"""Воркер gunicorn для продакшен-запуска: uvloop, httptools и корректная остановка.
+
+Запуск: gunicorn main:app -c gunicorn.conf.py
+"""
+
+import os
+from uvicorn_worker import UvicornWorker
+
+
+# Сколько секунд воркер дожидается завершения активных запросов при остановке
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", 30))
+
+
+class AppWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        # Оставляем запас до SIGKILL от gunicorn на закрытие пула соединений
+        "timeout_graceful_shutdown": max(SERVER_GRACEFUL_TIMEOUT - 5, 1),
+    }
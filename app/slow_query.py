@@ -0,0 +1,203 @@
+"""Журнал медленных SQL-запросов.
+
+Выражения дольше SLOW_QUERY_THRESHOLD_MS пишутся в отдельный лог
+(logs/slow_queries_*.log) без значений параметров - только их типы.
+Запросы группируются по отпечатку нормализованного текста: литералы и
+плейсхолдеры заменяются на ?, списки (?, ?, ?) - на (...). Первое появление
+отпечатка отмечается отдельно, поэтому новый медленный запрос (например,
+полный просмотр таблицы из-за ANY(tags) без индекса) виден сразу.
+
+Для доли SLOW_QUERY_EXPLAIN_RATE медленных SELECT выполняется
+EXPLAIN (ANALYZE, BUFFERS) в той же транзакции (внутри SAVEPOINT), не чаще
+раза в SLOW_QUERY_EXPLAIN_INTERVAL секунд на отпечаток. ANALYZE выполняет
+запрос повторно, поэтому выборку стоит держать небольшой.
+"""
+
+import os
+import re
+import time
+import random
+import hashlib
+from typing import Dict, List, Optional
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+# 0 - журнал выключен
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", 0))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", 300))
+# Сколько разных отпечатков хранить в статистике
+SLOW_QUERY_MAX_GROUPS = int(os.getenv("SLOW_QUERY_MAX_GROUPS", 1000))
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\$\d+|%\(\w+\)s|\?|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    statement = _LITERALS.sub("?", statement)
+    statement = _LISTS.sub("(...)", statement)
+    return _SPACES.sub(" ", statement).strip()
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize(statement).encode()).hexdigest()[:12]
+
+
+def redact(parameters, executemany: bool = False):
+    """Параметры без значений: только типы"""
+    if executemany:
+        return f"{len(parameters)} наборов параметров"
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class SlowQueryLog:
+    # Префикс EXPLAIN по диалекту; для остальных диалектов планы не снимаются
+    explain_prefixes = {"postgresql": "EXPLAIN (ANALYZE, BUFFERS) "}
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+        explain_rate: float = SLOW_QUERY_EXPLAIN_RATE,
+        explain_interval: float = SLOW_QUERY_EXPLAIN_INTERVAL,
+        max_groups: int = SLOW_QUERY_MAX_GROUPS,
+        clock=time.monotonic,
+        sample=random.random,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.explain_rate = explain_rate
+        self.explain_interval = explain_interval
+        self.max_groups = max_groups
+        self.clock = clock
+        self.sample = sample
+        self.groups: Dict[str, dict] = {}
+        self._explained: Dict[str, float] = {}
+        self.log = logger.bind(slow_query=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def instrument(self, engine: AsyncEngine, database: str = "primary"):
+        if not self.enabled:
+            return
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, params, context, many):
+            if context is not None:
+                context.slow_query_start = time.perf_counter()
+
+        @event.listens_for(sync_engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, params, context, many):
+            start = getattr(context, "slow_query_start", None)
+            if start is None:
+                return
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold:
+                self.record(conn, context, statement, params, many, elapsed, database)
+
+    def record(
+        self, conn, context, statement, parameters, executemany, elapsed, database
+    ):
+        """Запись медленного выражения в журнал и статистику отпечатка"""
+        normalized = normalize(statement)
+        key = fingerprint(statement)
+        group = self.groups.get(key)
+        if group is None and len(self.groups) < self.max_groups:
+            group = self.groups[key] = {
+                "statement": normalized,
+                "count": 0,
+                "total": 0.0,
+                "max": 0.0,
+            }
+            self.log.warning(
+                "Новый медленный запрос {}: {}", key, normalized, fingerprint=key
+            )
+        if group is not None:
+            group["count"] += 1
+            group["total"] += elapsed
+            group["max"] = max(group["max"], elapsed)
+        self.log.warning(
+            "Медленный запрос {} ({}): {:.1f} мс, параметры: {}",
+            key,
+            database,
+            elapsed * 1000,
+            redact(parameters, executemany),
+            fingerprint=key,
+            duration_ms=round(elapsed * 1000, 3),
+        )
+        if self.should_explain(conn, context, key, statement, executemany):
+            plan = self.explain(conn, statement, parameters)
+            if plan:
+                self.log.info(
+                    "План запроса {}:\n{}", key, "\n".join(plan), fingerprint=key
+                )
+
+    def should_explain(self, conn, context, key, statement, executemany) -> bool:
+        if self.explain_rate <= 0 or executemany:
+            return False
+        if conn.dialect.name not in self.explain_prefixes:
+            return False
+        # ANALYZE выполняет запрос еще раз, поэтому только чтение и без
+        # серверного курсора (поток заметок), который еще не дочитан
+        if not statement.lstrip()[:6].upper() == "SELECT":
+            return False
+        if context.execution_options.get("stream_results"):
+            return False
+        now = self.clock()
+        last = self._explained.get(key)
+        if last is not None and now - last < self.explain_interval:
+            return False
+        if self.sample() >= self.explain_rate:
+            return False
+        self._explained[key] = now
+        return True
+
+    def explain(self, conn, statement, parameters) -> Optional[List[str]]:
+        """План на отдельном курсоре; ошибка EXPLAIN не ломает транзакцию запроса"""
+        prefix = self.explain_prefixes[conn.dialect.name]
+        in_transaction = conn.in_transaction()
+        cursor = conn.connection.cursor()
+        try:
+            if in_transaction:
+                cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(prefix + statement, parameters)
+                plan = [str(row[-1]) for row in cursor.fetchall()]
+            except Exception:
+                if in_transaction:
+                    cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            if in_transaction:
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            return plan
+        except Exception as e:
+            logger.error(f"Ошибка EXPLAIN медленного запроса: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def stats(self, top: int = 10) -> List[dict]:
+        """Самые затратные отпечатки по суммарному времени"""
+        groups = sorted(self.groups.items(), key=lambda item: -item[1]["total"])
+        return [
+            {
+                "fingerprint": key,
+                "statement": group["statement"][:200],
+                "count": group["count"],
+                "total_ms": round(group["total"] * 1000, 1),
+                "avg_ms": round(group["total"] * 1000 / group["count"], 1),
+                "max_ms": round(group["max"] * 1000, 1),
+            }
+            for key, group in groups[:top]
+        ]
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,81 @@
+import pytest
+from cache import MemoryCacheBackend, NoteCache
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_least_recently_used():
+    """При переполнении вытесняется давно не использованный ключ"""
+    backend = MemoryCacheBackend(max_entries=2)
+    await backend.set("a", 1)
+    await backend.set("b", 2)
+    await backend.get("a")
+    await backend.set("c", 3)
+    assert await backend.get("a") == 1
+    assert await backend.get("b") is None
+    assert await backend.get("c") == 3
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_expires_by_ttl(monkeypatch):
+    """Запись с истекшим TTL не возвращается"""
+    now = [100.0]
+    monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+    backend = MemoryCacheBackend()
+    await backend.set("a", 1, ttl=10)
+    assert await backend.get("a") == 1
+    now[0] += 11
+    assert await backend.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_note_cache_read_through_and_invalidation():
+    """Повторное чтение идет из кэша, запись заметки сбрасывает кэш пользователя"""
+    cache = NoteCache(MemoryCacheBackend())
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"notes": [{"id": len(calls)}], "next_cursor": None}
+
+    params = {"limit": None, "after": None}
+    first = await cache.get_list(1, params, loader)
+    assert await cache.get_list(1, params, loader) == first
+    assert await cache.get_note(1, 5, loader) == {
+        "notes": [{"id": 2}],
+        "next_cursor": None,
+    }
+    assert len(calls) == 2
+
+    # Запись другого пользователя не трогает кэш первого
+    await cache.invalidate(2)
+    assert await cache.get_list(1, params, loader) == first
+    assert await cache.get_note(1, 5, loader) == {
+        "notes": [{"id": 2}],
+        "next_cursor": None,
+    }
+
+    await cache.invalidate(1)
+    assert (await cache.get_list(1, params, loader))["notes"] == [{"id": 3}]
+    assert (await cache.get_note(1, 5, loader))["notes"] == [{"id": 4}]
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 4
+
+
+@pytest.mark.asyncio
+async def test_note_read_racing_write_is_not_cached():
+    """Строка, прочитанная до коммита записи, не остается в кэше после нее"""
+    cache = NoteCache(MemoryCacheBackend())
+    versions = ["old"]
+
+    async def slow_loader():
+        value = {"title": versions[-1]}
+        # Запись коммитится и сбрасывает кэш, пока чтение еще не закончилось
+        versions.append("new")
+        await cache.invalidate(1)
+        return value
+
+    async def loader():
+        return {"title": versions[-1]}
+
+    assert await cache.get_note(1, 5, slow_loader) == {"title": "old"}
+    assert await cache.get_note(1, 5, loader) == {"title": "new"}
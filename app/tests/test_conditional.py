@@ -0,0 +1,56 @@
+from datetime import datetime
+from fastapi import Response
+from starlette.requests import Request
+from conditional import conditional_response, make_etag
+
+
+def make_request(headers: dict) -> Request:
+    raw = [(key.lower().encode(), value.encode()) for key, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+UPDATED_AT = datetime(2024, 9, 1, 12, 30, 15, 123456)
+ETAG = make_etag(1, UPDATED_AT.isoformat())
+
+
+def test_sets_validators_without_conditional_headers():
+    """Без условных заголовков ответ обычный, с ETag и Last-Modified"""
+    response = Response()
+    assert conditional_response(make_request({}), response, ETAG, UPDATED_AT) is None
+    assert response.headers["etag"] == ETAG
+    assert response.headers["last-modified"] == "Sun, 01 Sep 2024 12:30:15 GMT"
+
+
+def test_if_none_match_returns_304():
+    """Совпавший ETag (в том числе без префикса W/) дает 304"""
+    request = make_request({"If-None-Match": f'"other", {ETAG.removeprefix("W/")}'})
+    result = conditional_response(request, Response(), ETAG, UPDATED_AT)
+    assert result.status_code == 304
+    assert result.headers["etag"] == ETAG
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    """При несовпавшем ETag If-Modified-Since игнорируется"""
+    request = make_request(
+        {
+            "If-None-Match": '"other"',
+            "If-Modified-Since": "Sun, 01 Sep 2024 12:30:15 GMT",
+        }
+    )
+    assert conditional_response(request, Response(), ETAG, UPDATED_AT) is None
+
+
+def test_if_modified_since():
+    """If-Modified-Since сравнивается с точностью до секунды"""
+    same = make_request({"If-Modified-Since": "Sun, 01 Sep 2024 12:30:15 GMT"})
+    older = make_request({"If-Modified-Since": "Sun, 01 Sep 2024 12:30:14 GMT"})
+    assert conditional_response(same, Response(), ETAG, UPDATED_AT).status_code == 304
+    assert conditional_response(older, Response(), ETAG, UPDATED_AT) is None
+
+
+def test_etag_only_ignores_if_modified_since():
+    """Списки отдают только ETag: If-Modified-Since без него не дает 304"""
+    request = make_request({"If-Modified-Since": "Sun, 01 Sep 2024 12:30:15 GMT"})
+    response = Response()
+    assert conditional_response(request, response, ETAG) is None
+    assert "last-modified" not in response.headers
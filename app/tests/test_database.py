@@ -0,0 +1,17 @@
+import pytest
+from database import Database, db, get_engine
+from api import note as note_api, user as user_api
+
+
+def test_single_engine_per_process():
+    """Все модули и новые экземпляры Database используют один пул"""
+    assert note_api.db is user_api.db is db
+    assert Database().engine is db.engine is get_engine()
+
+
+@pytest.mark.asyncio
+async def test_session_checks_out_connection_lazily():
+    """Сессия без запросов не берет соединение из пула"""
+    async for session in db.get_session():
+        assert db.pool_stats()["checked_out"] == 0
+    assert db.pool_stats()["checked_out"] == 0
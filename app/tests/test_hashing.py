@@ -0,0 +1,80 @@
+import time
+import asyncio
+import threading
+import pytest
+from hashing import HashQueueFull, PasswordHasher, pwd_context
+
+HASHED = pwd_context.hash("password")
+
+
+async def measure_loop_lag(storm) -> float:
+    """Максимальная задержка короткой корутины (чтения заметки) во время storm"""
+    lag = 0.0
+    done = asyncio.Event()
+
+    async def note_read():
+        nonlocal lag
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag = max(lag, time.perf_counter() - started - 0.005)
+
+    reader = asyncio.create_task(note_read())
+    await asyncio.sleep(0.02)
+    try:
+        await storm()
+    finally:
+        done.set()
+        await reader
+    return lag
+
+
+def test_login_storm_does_not_block_reads():
+    """Пачка проверок паролей не останавливает остальные корутины воркера"""
+    hasher = PasswordHasher(executor="process", workers=2)
+
+    async def storm():
+        results = await asyncio.gather(
+            *[hasher.verify("password", HASHED) for _ in range(6)]
+        )
+        assert all(results)
+
+    async def blocking_storm():
+        for _ in range(2):
+            pwd_context.verify("password", HASHED)
+
+    async def main():
+        # Прогрев пула, чтобы не учитывать запуск процессов
+        await hasher.verify("password", HASHED)
+        return await measure_loop_lag(storm), await measure_loop_lag(blocking_storm)
+
+    try:
+        lag, blocking_lag = asyncio.run(main())
+    finally:
+        hasher.shutdown()
+    # Синхронный вызов блокирует loop на время одного хэша (~100-300 мс)
+    assert blocking_lag > 0.05
+    assert lag < 0.05
+    assert hasher.stats()["max_queue_depth"] >= 4
+
+
+def test_queue_is_bounded():
+    hasher = PasswordHasher(executor="thread", workers=1, max_queue=2)
+    release = threading.Event()
+
+    async def main():
+        tasks = [asyncio.create_task(hasher.run(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert hasher.stats()["active"] == 1
+        assert hasher.stats()["queue_depth"] == 2
+        with pytest.raises(HashQueueFull):
+            await hasher.run(release.wait)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    try:
+        asyncio.run(main())
+    finally:
+        hasher.shutdown()
+    stats = hasher.stats()
+    assert (stats["completed"], stats["rejected"], stats["queue_depth"]) == (3, 1, 0)
@@ -0,0 +1,36 @@
+from loguru import logger
+from config import LogFilter
+
+
+def make_record(name: str, level: str = "INFO", line: int = 1, **extra) -> dict:
+    return {"name": name, "level": logger.level(level), "line": line, "extra": extra}
+
+
+def test_module_levels():
+    """Уровень модуля наследуется от ближайшего заданного родителя"""
+    log_filter = LogFilter("INFO", "api=WARNING, api.user=DEBUG", "", 0)
+    assert not log_filter(make_record("api.note"))
+    assert log_filter(make_record("api.note", "ERROR"))
+    assert log_filter(make_record("api.user", "DEBUG"))
+    assert not log_filter(make_record("database", "DEBUG"))
+    assert log_filter.enabled("DEBUG", "api.user")
+    assert log_filter.lowest == logger.level("DEBUG").no
+
+
+def test_sampling_per_call_site(monkeypatch):
+    """Частая строка пишется не чаще rate раз в секунду, пропуски считаются"""
+    now = [100.0]
+    monkeypatch.setattr("config.time.monotonic", lambda: now[0])
+    log_filter = LogFilter("INFO", "", "api.note", 3)
+    kept = [log_filter(make_record("api.note")) for _ in range(10)]
+    assert kept == [True] * 3 + [False] * 7
+    # Другое место в коде и предупреждения выборке не подлежат
+    assert log_filter(make_record("api.note", line=2))
+    assert log_filter(make_record("api.note", "WARNING"))
+    assert log_filter(make_record("database"))
+
+    now[0] += 1
+    record = make_record("api.note")
+    assert log_filter(record)
+    assert record["extra"]["dropped"] == 7
+    assert log_filter(make_record("cache", sample=True))
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from cache import MemoryCacheBackend
+from login_cache import LoginCache
+import main
+from api import user as user_api
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeSession:
+    def __init__(self, users: dict):
+        self.users = users
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        telegram_id = query.whereclause.right.value
+        return FakeResult(self.users.get(telegram_id))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    session = FakeSession({100: 1})
+
+    async def get_session():
+        yield session
+
+    monkeypatch.setattr(user_api, "login_cache", LoginCache(MemoryCacheBackend()))
+    main.app.dependency_overrides[user_api.db.get_session] = get_session
+    yield TestClient(main.app), session
+    main.app.dependency_overrides.clear()
+
+
+def test_login_by_telegram_id_uses_cache(client):
+    """Повторный вход не ходит в базу и получает тот же токен"""
+    client, session = client
+    first = client.post("/api/login_by_telegram_id", json={"telegram_id": 100})
+    second = client.post("/api/login_by_telegram_id", json={"telegram_id": 100})
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert session.queries == 1
+    assert user_api.login_cache.stats()["tokens_reused"] == 1
+
+
+def test_unknown_telegram_id_cached_until_invalidated(client):
+    client, session = client
+    for _ in range(2):
+        response = client.post("/api/login_by_telegram_id", json={"telegram_id": 200})
+        assert response.status_code == 401
+    assert session.queries == 1
+    # Регистрация с этим telegram_id сбрасывает отрицательный результат
+    session.users[200] = 2
+    asyncio.run(user_api.login_cache.invalidate(200))
+    response = client.post("/api/login_by_telegram_id", json={"telegram_id": 200})
+    assert response.status_code == 200
+    assert session.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_token_not_reused_without_enough_lifetime():
+    cache = LoginCache(MemoryCacheBackend(), reuse_ratio=1.0)
+    await cache.set_token(1, "token", lifetime=1800)
+    assert await cache.get_token(1) is None
@@ -0,0 +1,93 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from starlette.requests import Request
+import main
+import metrics
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_labeled_by_route_template(monkeypatch):
+    """Метка route - шаблон пути, а не путь с id заметки"""
+    labels = {"method": "GET", "route": "/api/notes/{note_id}"}
+    before = sample("http_requests_total", status="401", **labels)
+    client = TestClient(main.app)
+    assert client.get("/api/notes/1").status_code == 401
+    assert client.get("/api/notes/2").status_code == 401
+    assert sample("http_requests_total", status="401", **labels) == before + 2
+    assert sample("http_request_duration_seconds_count", **labels) >= 2
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "scrape")
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/notes/{note_id}"' in response.text
+    assert "/api/notes/1" not in response.text
+
+
+def test_metrics_require_allowed_address_or_token(monkeypatch):
+    """Без токена /metrics доступен только из разрешенных сетей"""
+    client = TestClient(main.app)
+    assert client.get("/metrics").status_code == 404
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "scrape")
+    wrong = {"Authorization": "Bearer wrong"}
+    assert client.get("/metrics", headers=wrong).status_code == 404
+    assert metrics.scrape_allowed("127.0.0.1", "")
+    assert metrics.scrape_allowed("::1", "")
+    assert not metrics.scrape_allowed("203.0.113.7", "")
+    assert metrics.scrape_allowed("203.0.113.7", "Bearer scrape")
+
+
+def test_rate_limit_rejections_are_counted():
+    route = SimpleNamespace(path="/api/notes/")
+    request = Request({"type": "http", "route": route, "headers": []})
+    before = sample("rate_limit_rejections_total", route="/api/notes/")
+    response = asyncio.run(main.rate_limit_error(request, None))
+    assert response.status_code == 429
+    assert sample("rate_limit_rejections_total", route="/api/notes/") == before + 1
+
+
+def test_pool_gauges_and_checkout_wait():
+    pool = metrics.pool_class("test")(
+        lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=1
+    )
+    first, second = pool.connect(), pool.connect()
+    assert sample("db_pool_connections_in_use", database="test") == 2
+    assert sample("db_pool_overflow_connections", database="test") == 1
+    assert sample("db_pool_checkout_wait_seconds_count", database="test") == 2
+    first.close()
+    second.close()
+    assert sample("db_pool_connections_in_use", database="test") == 0
+    assert sample("db_pool_overflow_connections", database="test") == 0
+    # Пересозданный пул (dispose, after_fork) сохраняет метку
+    assert pool.recreate().database == "test"
+
+
+def test_statement_timing_from_engine_events():
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(SimpleNamespace(sync_engine=engine), "statements")
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        conn.execute(text("pragma user_version"))
+    assert (
+        sample(
+            "db_statement_duration_seconds_count",
+            database="statements",
+            operation="SELECT",
+        )
+        == 1
+    )
+    assert (
+        sample(
+            "db_statement_duration_seconds_count",
+            database="statements",
+            operation="OTHER",
+        )
+        == 1
+    )
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+import pytest
+from migrations import backfill, get_migrations, head_version
+
+
+def test_migration_versions_are_sequential():
+    """Версии миграций идут подряд, начиная с 1"""
+    versions = [migration.VERSION for migration in get_migrations()]
+    assert versions == list(range(1, len(versions) + 1))
+    assert head_version() == versions[-1]
+
+
+def test_migrations_have_metadata():
+    """У каждой миграции есть описание, признак транзакции и upgrade"""
+    for migration in get_migrations():
+        assert migration.DESCRIPTION
+        assert isinstance(migration.TRANSACTIONAL, bool)
+        assert callable(migration.upgrade)
+
+
+class FakeBackfillConnection:
+    """UPDATE возвращает заданные rowcount; EXISTS - есть ли еще строки"""
+
+    def __init__(self, rowcounts, remaining):
+        self.rowcounts = list(rowcounts)
+        self.remaining = list(remaining)
+
+    async def execute(self, statement, params=None):
+        if str(statement).startswith("UPDATE"):
+            return SimpleNamespace(rowcount=self.rowcounts.pop(0))
+        return SimpleNamespace(scalar=lambda: self.remaining.pop(0))
+
+
+@pytest.mark.asyncio
+async def test_backfill_retries_rows_skipped_as_locked():
+    """Пустой пакет при оставшихся (заблокированных) строках не завершает заполнение"""
+    conn = FakeBackfillConnection([2, 0, 0, 1, 0], remaining=[True, True, False])
+    total = await backfill(conn, "notes", "x = 1", "x IS NULL", retry_delay=0)
+    assert total == 3
+    assert conn.rowcounts == [] and conn.remaining == []
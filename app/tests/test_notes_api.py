@@ -0,0 +1,452 @@
+"""Эндпоинты заметок без Postgres: сессия базы - заглушка.
+
+    cd app && python -m pytest -q tests/test_notes_api.py
+"""
+
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta
+import pytest
+from fastapi import Response
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, literal, select
+from sqlalchemy.dialects import postgresql
+from starlette.requests import Request
+from cache import MemoryCacheBackend, NoteCache
+import main
+from api import note as note_api
+from api.note import NoteProjection
+from rate_limit import limiter
+from schemas.note import NoteView
+
+UPDATED_AT = datetime(2024, 9, 1, 12, 30)
+USER_ID = 1
+FULL_KEYS = ("id", "title", "content", "tags", "created_at", "updated_at")
+Row = namedtuple("Row", FULL_KEYS)
+
+
+def make_rows(count: int, first_id: int = 1) -> list:
+    """Строки полной проекции, от новых к старым"""
+    return [
+        Row(
+            note_id,
+            f"Заметка {note_id}",
+            f"Текст {note_id}",
+            ["x"],
+            UPDATED_AT,
+            UPDATED_AT - timedelta(minutes=note_id),
+        )
+        for note_id in range(first_id, first_id + count)
+    ]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def scalars(self):
+        return self
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def all(self):
+        return self.rows
+
+    def one(self):
+        return self.rows[0]
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeSession:
+    """Отдает заранее заданные результаты по порядку и запоминает запросы"""
+
+    bind = None
+
+    def __init__(self):
+        self.results = []
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement, *args):
+        self.statements.append(statement)
+        return FakeResult(self.results.pop(0))
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    session = FakeSession()
+
+    async def get_session():
+        yield session
+
+    monkeypatch.setattr(limiter, "enabled", False)
+    monkeypatch.setattr(note_api, "note_cache", NoteCache(None))
+    overrides = main.app.dependency_overrides
+    overrides[note_api.get_current_user_id] = lambda: USER_ID
+    overrides[note_api.get_read_session] = get_session
+    overrides[note_api.get_write_session] = get_session
+    yield TestClient(main.app), session
+    overrides.clear()
+
+
+def sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class ProbeSession:
+    """Сессия, отвечающая на пробу списка: count и max(updated_at)"""
+
+    def __init__(self):
+        self.queries = 0
+
+    async def execute(self, statement):
+        self.queries += 1
+        return self
+
+    def one(self):
+        return 3, UPDATED_AT
+
+
+def make_request() -> Request:
+    return Request({"type": "http", "method": "GET", "headers": []})
+
+
+def projection(**kwargs) -> NoteProjection:
+    values = {"view": NoteView.full, "fields": None, "preview": None, **kwargs}
+    return NoteProjection(**values)
+
+
+@pytest.mark.asyncio
+async def test_preview_changes_list_cache_key_and_etag(monkeypatch):
+    """Списки с разной длиной превью не делят кэш и ETag"""
+    monkeypatch.setattr(note_api, "note_cache", NoteCache(MemoryCacheBackend()))
+    db = ProbeSession()
+    etags = []
+    for preview in (100, 200, 100):
+        response = Response()
+        params = {"limit": None, "after": None, **projection(preview=preview).params()}
+        assert (
+            await note_api.check_list_modified(
+                make_request(), response, db, 1, [], params
+            )
+            is None
+        )
+        etags.append(response.headers["etag"])
+    assert etags[0] != etags[1]
+    assert etags[0] == etags[2]
+    # Третий запрос совпал с первым и взят из кэша
+    assert db.queries == 2
+
+
+def test_escape_html():
+    """Разметка из текста заметки превращается в сущности"""
+    engine = create_engine("sqlite://")
+    content = '<script>alert("&")</script>'
+    with engine.connect() as connection:
+        escaped = connection.scalar(select(note_api.escape_html(literal(content))))
+    assert escaped == '&lt;script&gt;alert("&amp;")&lt;/script&gt;'
+
+
+def test_search_highlight_escapes_content(client):
+    """ts_headline получает экранированный текст: в snippet только <b>"""
+    client, session = client
+    snippet = "&lt;script&gt;<b>alert</b>(1)&lt;/script&gt;"
+    session.results.append(
+        [
+            {
+                "id": 1,
+                "title": "XSS",
+                "tags": [],
+                "created_at": UPDATED_AT,
+                "updated_at": UPDATED_AT,
+                "rank": 0.1,
+                "snippet": snippet,
+            }
+        ]
+    )
+    response = client.get("/api/notes/search", params={"q": "alert", "highlight": 1})
+    assert response.status_code == 200
+    assert response.json()[0]["snippet"] == snippet
+    query = sql(session.statements[0])
+    assert "ts_headline(" in query
+    assert "replace(replace(replace(notes.content" in query
+
+
+def list_results(session, rows, total=None):
+    """Проба условного GET (count, max(updated_at)) и строки страницы"""
+    session.results += [[(len(rows) if total is None else total, UPDATED_AT)], rows]
+
+
+def test_list_pages_follow_cursor(client):
+    client, session = client
+    list_results(session, make_rows(3), total=5)
+    response = client.get("/api/notes/", params={"limit": 2})
+    assert response.status_code == 200
+    assert [note["id"] for note in response.json()] == [1, 2]
+    cursor = response.headers["X-Next-Cursor"]
+    assert note_api.decode_cursor(cursor) == (UPDATED_AT - timedelta(minutes=2), 2)
+
+    # Следующая страница отсекается по курсору, последняя - без X-Next-Cursor
+    list_results(session, make_rows(1, first_id=3))
+    response = client.get("/api/notes/", params={"limit": 2, "after": cursor})
+    assert [note["id"] for note in response.json()] == [3]
+    assert "X-Next-Cursor" not in response.headers
+    assert "(notes.updated_at, notes.id) <" in sql(session.statements[-1])
+
+
+def test_list_bad_cursor_and_empty_page(client):
+    client, session = client
+    # До страницы дело не доходит: курсор разбирается при ее запросе
+    session.results.append([(0, None)])
+    response = client.get("/api/notes/", params={"after": "не курсор"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Некорректный курсор"
+
+    list_results(session, [], total=0)
+    assert client.get("/api/notes/").status_code == 404
+    # Размер страницы ограничен NOTES_MAX_PAGE_SIZE
+    too_big = note_api.NOTES_MAX_PAGE_SIZE + 1
+    assert client.get("/api/notes/", params={"limit": too_big}).status_code == 422
+
+
+def test_list_stream_ndjson(client, monkeypatch):
+    """stream=true читает строки из курсора отдельной сессии и отдает NDJSON"""
+    client, session = client
+
+    class StreamSession:
+        def __init__(self, bind):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def stream(self, query):
+            async def rows():
+                for row in make_rows(3):
+                    yield row
+
+            return rows()
+
+    monkeypatch.setattr(note_api, "AsyncSession", StreamSession)
+    response = client.get("/api/notes/", params={"stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [note["id"] for note in lines] == [1, 2, 3]
+    assert lines[0]["updated_at"] == (UPDATED_AT - timedelta(minutes=1)).isoformat()
+    assert session.statements == []
+
+
+def test_tag_search_operators(client):
+    """match=all - оператор @>, match=any - &&; /notes/tag/{tag} - как all"""
+    client, session = client
+    for path, params, operator in (
+        ("/api/notes/tags", {"tags": ["a", "b"]}, "@>"),
+        ("/api/notes/tags", {"tags": ["a", "b"], "match": "any"}, "&&"),
+        ("/api/notes/tag/a", {}, "@>"),
+    ):
+        list_results(session, make_rows(2))
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        assert [note["id"] for note in response.json()] == [1, 2]
+        assert f"notes.tags {operator}" in sql(session.statements[-1])
+
+
+def test_tag_search_errors(client):
+    client, session = client
+    list_results(session, [], total=0)
+    response = client.get("/api/notes/tags", params={"tags": ["missing"]})
+    assert response.status_code == 404
+    # Без тегов и с неизвестным match запрос не доходит до базы
+    assert client.get("/api/notes/tags").status_code == 422
+    response = client.get("/api/notes/tags", params={"tags": ["a"], "match": "none"})
+    assert response.status_code == 422
+    assert len(session.statements) == 2
+
+
+def search_rows(count: int) -> list:
+    return [{**row._asdict(), "rank": 1.0 / row.id} for row in make_rows(count)]
+
+
+def test_search_pages_by_offset(client):
+    client, session = client
+    session.results.append(search_rows(3))
+    response = client.get("/api/notes/search", params={"q": "текст", "limit": 2})
+    assert response.status_code == 200
+    notes = response.json()
+    assert [note["id"] for note in notes] == [1, 2]
+    assert notes[0]["content"] == "Текст 1" and notes[0]["snippet"] is None
+    assert response.headers["X-Next-Offset"] == "2"
+    query = sql(session.statements[-1])
+    assert "websearch_to_tsquery" in query and "ts_headline" not in query
+
+    session.results.append(search_rows(1))
+    response = client.get("/api/notes/search", params={"q": "текст", "offset": 2})
+    assert "X-Next-Offset" not in response.headers
+
+
+def test_search_errors(client):
+    client, session = client
+    session.results.append([])
+    assert client.get("/api/notes/search", params={"q": "нет"}).status_code == 404
+    assert client.get("/api/notes/search", params={"q": ""}).status_code == 422
+    response = client.get("/api/notes/search", params={"q": "a", "offset": -1})
+    assert response.status_code == 422
+    assert len(session.statements) == 1
+
+
+def note_dicts(*ids) -> list:
+    rows = {row.id: row._asdict() for row in make_rows(max(ids))}
+    return [rows[note_id] for note_id in ids]
+
+
+def test_bulk_partial_results(client):
+    """Пакет не падает целиком: отсутствующие и чужие заметки получают 404"""
+    client, session = client
+    session.results.append(note_dicts(3, 1))
+    response = client.get("/api/notes/bulk", params={"ids": [1, 2, 3]})
+    assert response.status_code == 200
+    results = response.json()
+    assert [(item["id"], item["status"]) for item in results] == [
+        (1, 200),
+        (2, 404),
+        (3, 200),
+    ]
+    assert results[0]["note"]["title"] == "Заметка 1"
+
+    session.results.append(note_dicts(1))
+    response = client.patch(
+        "/api/notes/bulk", json=[{"id": 1, "title": "Новая"}, {"id": 2}]
+    )
+    assert [item["status"] for item in response.json()] == [200, 404]
+
+    session.results.append([2])
+    response = client.request("DELETE", "/api/notes/bulk", json=[1, 2])
+    assert [item["status"] for item in response.json()] == [404, 200]
+    # Каждый пакет - один запрос и одна транзакция
+    assert len(session.statements) == 3
+    assert session.commits == 2
+
+
+def test_bulk_create_keeps_order(client):
+    client, session = client
+    session.results.append(note_dicts(2, 1))
+    body = [
+        {"title": "Заметка 2", "content": "Текст 2"},
+        {"title": "Заметка 1", "content": "Текст 1"},
+    ]
+    response = client.post("/api/notes/bulk", json=body)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [2, 1]
+    assert session.commits == 1
+
+
+def test_bulk_rejected_before_database(client):
+    client, session = client
+    response = client.request("DELETE", "/api/notes/bulk", json=[1, 1])
+    assert response.status_code == 400
+    response = client.patch("/api/notes/bulk", json=[{"id": 1}, {"id": 1}])
+    assert response.status_code == 400
+    too_many = list(range(note_api.NOTES_BULK_MAX_ITEMS + 1))
+    response = client.request("DELETE", "/api/notes/bulk", json=too_many)
+    assert response.status_code == 422
+    assert client.post("/api/notes/bulk", json=[]).status_code == 422
+    assert session.statements == []
+
+
+def test_single_statement_writes(client):
+    """Создание, изменение и удаление - по одному запросу с RETURNING"""
+    client, session = client
+    session.results.append(note_dicts(1))
+    response = client.post("/api/notes/", json={"title": "Заметка 1", "content": "Т"})
+    assert response.status_code == 200 and response.json()["id"] == 1
+    assert sql(session.statements[-1]).startswith("INSERT INTO notes")
+
+    session.results.append(note_dicts(1))
+    response = client.put("/api/notes/1", json={"title": "Новая"})
+    assert response.status_code == 200
+    query = sql(session.statements[-1])
+    assert query.startswith("UPDATE notes SET title=")
+    assert "content=" not in query and "RETURNING" in query
+    assert "notes.user_id = " in query
+
+    session.results.append([1])
+    assert client.delete("/api/notes/1").status_code == 200
+    assert "RETURNING notes.id" in sql(session.statements[-1])
+    assert len(session.statements) == 3
+    assert session.commits == 3
+
+
+def test_single_statement_writes_not_found(client):
+    """Нет заметки или она чужая: 404 без коммита"""
+    client, session = client
+    session.results += [[], []]
+    assert client.put("/api/notes/7", json={"title": "x"}).status_code == 404
+    assert client.delete("/api/notes/7").status_code == 404
+    assert session.commits == 0
+
+
+def projected_rows(count: int, keys: tuple, preview: int = 0) -> list:
+    """Строки с колонками проекции в порядке запроса (и updated_at для курсора)"""
+    columns = keys if "updated_at" in keys else keys + ("updated_at",)
+    Projected = namedtuple("Projected", columns)
+    rows = []
+    for row in make_rows(count):
+        values = {**row._asdict(), "content_preview": row.content[:preview]}
+        rows.append(Projected(*(values[key] for key in columns)))
+    return rows
+
+
+def test_list_projections(client):
+    client, session = client
+    summary = ("id", "title", "tags", "created_at", "updated_at")
+    list_results(session, projected_rows(2, summary))
+    response = client.get("/api/notes/", params={"view": "summary"})
+    assert response.status_code == 200
+    assert list(response.json()[0]) == list(summary)
+    assert "notes.content" not in sql(session.statements[-1])
+
+    list_results(session, projected_rows(2, ("id", "title")))
+    response = client.get("/api/notes/tag/x", params={"fields": "title"})
+    assert response.json()[0] == {"id": 1, "title": "Заметка 1"}
+
+    keys = ("id", "title", "content_preview")
+    list_results(session, projected_rows(2, keys, preview=3))
+    params = {"fields": "title", "preview": 3}
+    response = client.get("/api/notes/tags", params={"tags": "x", **params})
+    assert response.json()[0] == {
+        "id": 1,
+        "title": "Заметка 1",
+        "content_preview": "Тек",
+    }
+    assert "left(notes.content" in sql(session.statements[-1])
+
+
+def test_list_projection_validation(client):
+    client, session = client
+    for params in (
+        {"fields": "password"},
+        {"view": "brief"},
+        {"preview": 0},
+        {"preview": note_api.NOTES_MAX_PREVIEW + 1},
+    ):
+        assert client.get("/api/notes/", params=params).status_code == 422
+    assert session.statements == []
@@ -0,0 +1,101 @@
+import multiprocessing
+import sqlite3
+import time
+import pytest
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, MovingWindowRateLimiter
+import main
+import rate_limit
+from api import note as note_api, user as user_api
+from rate_limit import SharedMemoryStorage
+
+
+def hit_many(uri: str, attempts: int, results):
+    limiter = MovingWindowRateLimiter(storage_from_string(uri))
+    item = parse("50/minute")
+    results.put(sum(limiter.hit(item, "client") for _ in range(attempts)))
+
+
+def test_shared_memory_limit_is_global_across_processes(tmp_path):
+    """Четыре процесса вместе пропускают ровно лимит, а не лимит на процесс"""
+    uri = f"shm://{tmp_path}/limits.sqlite"
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [
+        context.Process(target=hit_many, args=(uri, 30, results)) for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sum(results.get() for _ in workers) == 50
+    window_start, acquired = storage_from_string(uri).get_moving_window(
+        "LIMITER/client/50/1/minute", 50, 60
+    )
+    assert acquired == 50
+
+
+def test_shared_memory_fixed_window(tmp_path):
+    storage = SharedMemoryStorage(f"shm://{tmp_path}/fixed.sqlite")
+    limiter = FixedWindowRateLimiter(storage)
+    item = parse("2/minute")
+    assert [limiter.hit(item, "a") for _ in range(3)] == [True, True, False]
+    assert limiter.hit(item, "b")
+    storage.clear(item.key_for("a"))
+    assert limiter.hit(item, "a")
+
+
+def test_single_limiter_with_route_overrides(monkeypatch):
+    """Все роутеры используют один ограничитель, лимиты берутся из RATE_LIMITS"""
+    assert main.app.state.limiter is rate_limit.limiter
+    monkeypatch.setitem(rate_limit.RATE_LIMITS, "probe", "1/minute")
+
+    @rate_limit.route_limit("100/minute")
+    async def probe(request):
+        pass
+
+    limits = rate_limit.limiter._route_limits[f"{__name__}.probe"]
+    assert [str(limit.limit) for limit in limits] == ["1 per 1 minute"]
+    assert note_api.route_limit is user_api.route_limit
+
+
+def test_shared_memory_fails_open_when_locked(tmp_path):
+    """Занятая другим процессом блокировка не задерживает запрос дольше timeout"""
+    uri = f"shm://{tmp_path}/locked.sqlite"
+    storage = SharedMemoryStorage(uri, timeout=0.01)
+    limiter = MovingWindowRateLimiter(storage)
+    item = parse("1/minute")
+    assert limiter.hit(item, "a")
+
+    other = sqlite3.connect(storage.path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.perf_counter()
+        assert limiter.hit(item, "a")
+        assert time.perf_counter() - start < 1
+        assert storage.lock_timeouts == 1
+    finally:
+        other.execute("ROLLBACK")
+    assert not limiter.hit(item, "a")
+
+
+def redis_storage(server):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    storage = storage_from_string("redis://localhost:6379/0")
+    storage.storage = fakeredis.FakeRedis(server=server)
+    # Lua-скрипты регистрируются на клиенте
+    storage.initialize_storage("redis://localhost:6379/0")
+    return storage
+
+
+def test_redis_moving_window_is_shared_between_workers():
+    """Два воркера с одним Redis вместе пропускают ровно лимит"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    workers = [MovingWindowRateLimiter(redis_storage(server)) for _ in range(2)]
+    item = parse("3/minute")
+    results = [workers[attempt % 2].hit(item, "client") for attempt in range(6)]
+    assert results == [True, True, True, False, False, False]
+    assert workers[1].get_window_stats(item, "client").remaining == 0
@@ -0,0 +1,123 @@
+import pytest
+from sqlalchemy import text
+from cache import MemoryCacheBackend, RedisCacheBackend, SharedMemoryCacheBackend
+from database import create_engine, db
+from replicas import RecentWrites, ReplicaRouter
+from api import note as note_api
+
+# Заглушки реплик: на этих портах никто не слушает
+DOWN_URLS = [f"postgresql+asyncpg://u:p@127.0.0.1:{port}/db" for port in (1, 2)]
+
+
+class HealthyEngine:
+    """Заглушка движка, который всегда отвечает на SELECT 1"""
+
+    class Connection:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def execute(self, statement):
+            pass
+
+    def connect(self):
+        return self.Connection()
+
+
+@pytest.fixture
+def router():
+    now = [0.0]
+    router = ReplicaRouter(
+        [create_engine(url) for url in DOWN_URLS],
+        health_interval=5,
+        clock=lambda: now[0],
+    )
+    router.now = now
+    return router
+
+
+def test_round_robin(router):
+    first, second = router.replicas
+    assert [router.pick() for _ in range(4)] == [first, second, first, second]
+
+
+@pytest.mark.asyncio
+async def test_connection_error_takes_replica_out_of_rotation(router):
+    """Ошибка соединения исключает реплику до следующей проверки"""
+    first, second = router.replicas
+    replica = router.pick()
+    async with replica.SessionLocal() as session:
+        with pytest.raises(Exception):
+            await session.execute(text("SELECT 1"))
+    assert not router.is_healthy(first)
+    assert [router.pick() for _ in range(2)] == [second, second]
+
+    # Проверка здоровья возвращает ожившую реплику в ротацию
+    first.engine = HealthyEngine()
+    await router.check_health()
+    assert router.is_healthy(first)
+    assert not router.is_healthy(second)
+    assert router.pick() is first
+
+
+@pytest.mark.asyncio
+async def test_read_your_writes(router, monkeypatch):
+    """Сразу после записи пользователь читает из primary, остальные - из реплик"""
+    monkeypatch.setattr(db, "replicas", router)
+    monkeypatch.setattr(
+        note_api, "recent_writes", RecentWrites(MemoryCacheBackend(), window=5)
+    )
+    write = note_api.get_write_session(user_id=1)
+    async for session in write:
+        assert session.bind is db.engine
+
+    async def read_bind(user_id):
+        async for session in note_api.get_read_session(user_id=user_id):
+            return session.bind
+
+    assert await read_bind(1) is db.engine
+    assert await read_bind(2) in {replica.engine for replica in router.replicas}
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_primary_without_healthy_replicas(router, monkeypatch):
+    monkeypatch.setattr(db, "replicas", router)
+    for replica in router.replicas:
+        router.mark_down(replica)
+    assert db.read_sessionmaker() is db.SessionLocal
+    router.now[0] += 5
+    assert db.read_sessionmaker() is router.replicas[0].SessionLocal
+
+
+def shared_backends(kind, tmp_path):
+    """Два бэкенда одного хранилища, как в двух воркерах"""
+    if kind == "shm":
+        uri = f"shm://{tmp_path / 'notes-cache.sqlite'}"
+        return [SharedMemoryCacheBackend(uri) for _ in range(2)]
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    backends = [RedisCacheBackend() for _ in range(2)]
+    for backend in backends:
+        backend._redis = fakeredis.FakeAsyncRedis(server=server)
+    return backends
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["shm", "redis"])
+async def test_recent_writes_shared_between_workers(kind, tmp_path):
+    """Запись в одном воркере направляет чтения в другом в primary"""
+    first, second = [
+        RecentWrites(backend, window=5) for backend in shared_backends(kind, tmp_path)
+    ]
+    await first.mark(1)
+    assert await second.contains(1)
+    assert not await second.contains(2)
+
+
+@pytest.mark.asyncio
+async def test_recent_writes_without_backend_reads_primary():
+    """Без общего хранилища отметок чтения идут в primary"""
+    assert await RecentWrites(None, window=5).contains(1)
+    assert not await RecentWrites(None, window=0).contains(1)
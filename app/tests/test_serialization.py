@@ -0,0 +1,35 @@
+import json
+from datetime import datetime
+from typing import List
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from schemas.note import NoteSummary
+from serialization import FastJSONResponse, RowSerializer
+
+ROWS = [
+    (1, "Заголовок", "Текст", ["a", "b"], datetime(2024, 1, 1), datetime(2024, 1, 2)),
+    (2, "Title", "Body", None, datetime(2024, 1, 1), datetime(2024, 1, 2, 3, 4, 5, 6)),
+]
+KEYS = ("id", "title", "content", "tags", "created_at", "updated_at")
+
+
+def test_fast_path_matches_response_model_output():
+    """Быстрый путь дает те же байты, что и валидация через response_model"""
+    notes = RowSerializer(KEYS).many(ROWS)
+    adapter = TypeAdapter(List[NoteSummary])
+    expected = JSONResponse(
+        adapter.dump_python(
+            adapter.validate_python(notes), mode="json", exclude_unset=True
+        )
+    ).body
+    assert FastJSONResponse(notes).body == expected
+
+
+def test_row_serializer_drops_extra_columns():
+    """Колонки сверх ключей проекции (курсор) в ответ не попадают"""
+    serializer = RowSerializer(("id", "title"))
+    row = (1, "Заголовок", datetime(2024, 1, 1))
+    assert serializer(row) == {"id": 1, "title": "Заголовок"}
+    assert json.loads(FastJSONResponse([serializer(row)]).body) == [
+        {"id": 1, "title": "Заголовок"}
+    ]
@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+from loguru import logger
+from sqlalchemy import create_engine, text
+from slow_query import SlowQueryLog, fingerprint, normalize, redact
+
+
+def test_fingerprint_ignores_literals_and_list_lengths():
+    first = "SELECT * FROM notes WHERE user_id = 1 AND id IN (1, 2, 3)"
+    second = "SELECT *  FROM notes\nWHERE user_id = 42 AND id IN (7, 8)"
+    assert fingerprint(first) == fingerprint(second)
+    assert normalize(first) == "SELECT * FROM notes WHERE user_id = ? AND id IN (...)"
+    assert normalize("SELECT $1::VARCHAR, 'x''y' FROM anon_1") == (
+        "SELECT ?::VARCHAR, ? FROM anon_1"
+    )
+    assert fingerprint(first) != fingerprint("SELECT * FROM notes WHERE id = 1")
+
+
+def test_parameters_are_redacted():
+    assert redact(("secret", 1)) == ["str", "int"]
+    assert redact({"title": "secret"}) == {"title": "str"}
+    assert redact([("a",), ("b",)], executemany=True) == "2 наборов параметров"
+
+
+def test_slow_statements_grouped_and_explained():
+    """Медленные выражения пишутся в свой лог с планом и без значений параметров"""
+    records = []
+    sink = logger.add(
+        lambda message: records.append(message.record),
+        filter=lambda record: "slow_query" in record["extra"],
+        format="{message}",
+    )
+    slow_log = SlowQueryLog(threshold_ms=0.000001, explain_rate=1, sample=lambda: 0)
+    slow_log.explain_prefixes = {"sqlite": "EXPLAIN QUERY PLAN "}
+    engine = create_engine("sqlite://")
+    slow_log.instrument(SimpleNamespace(sync_engine=engine))
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE notes (id INTEGER, title TEXT)"))
+            for note_id in (1, 2, 3):
+                conn.execute(
+                    text("SELECT * FROM notes WHERE title = :title"),
+                    {"title": f"secret {note_id}"},
+                )
+            assert conn.execute(text("SELECT count(*) FROM notes")).scalar() == 0
+    finally:
+        logger.remove(sink)
+
+    stats = {group["statement"]: group for group in slow_log.stats()}
+    assert stats["SELECT * FROM notes WHERE title = ?"]["count"] == 3
+    messages = "\n".join(record["message"] for record in records)
+    assert "secret" not in messages
+    assert "['str']" in messages
+    # План снимается один раз на отпечаток за интервал
+    plans = [r for r in records if r["message"].startswith("План запроса")]
+    assert len(plans) == 2
+    assert "SCAN notes" in plans[0]["message"]
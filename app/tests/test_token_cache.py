@@ -0,0 +1,91 @@
+import time
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from api import note as note_api
+from token_cache import TokenCache, TokenClaimsError
+
+
+def make_token(**claims) -> str:
+    return jwt.encode(claims, note_api.SECRET_KEY, algorithm=note_api.ALGORITHM)
+
+
+class CountingDecode:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, token: str) -> dict:
+        self.calls += 1
+        return note_api.decode_token(token)
+
+
+def test_valid_token_decoded_once():
+    """Повторные запросы с тем же токеном не вызывают jwt.decode"""
+    cache = TokenCache()
+    decode = CountingDecode()
+    token = make_token(user_id=1, exp=int(time.time()) + 60)
+    for _ in range(5):
+        assert cache.verify(token, decode)["user_id"] == 1
+    assert decode.calls == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (4, 1)
+    assert stats["decode_seconds_saved"] > 0
+
+
+def test_entry_evicted_at_exp():
+    """После exp запись удаляется, а повторная проверка падает как раньше"""
+    now = [1000.0]
+    cache = TokenCache(clock=lambda: now[0])
+    cache.set("token", {"user_id": 1, "exp": 1010})
+    assert cache.get("token") == {"user_id": 1, "exp": 1010}
+    now[0] = 1010.0
+    assert cache.get("token") is None
+    assert len(cache) == 0
+
+
+def test_bounded_lru():
+    cache = TokenCache(max_entries=2, clock=lambda: 0.0)
+    for token in ("a", "b", "c"):
+        cache.set(token, {"exp": 100})
+    assert cache.get("a") is None
+    assert len(cache) == 2
+
+
+def test_invalid_token_not_cached():
+    cache = TokenCache()
+    decode = CountingDecode()
+    with pytest.raises(Exception):
+        cache.verify("garbage", decode)
+    assert len(cache) == 0
+
+
+def test_iat_checks():
+    now = 1000.0
+    cache = TokenCache(verify_iat=True, max_age=60, clock=lambda: now)
+    cache.check_claims({"iat": 990})
+    with pytest.raises(TokenClaimsError):
+        cache.check_claims({"iat": 1100})
+    with pytest.raises(TokenClaimsError):
+        cache.check_claims({"iat": 900})
+    with pytest.raises(TokenClaimsError):
+        cache.check_claims({})
+    # Запись живет не дольше max_age от iat, даже если exp позже
+    cache.set("token", {"iat": 990, "exp": 5000})
+    assert cache._data[cache._key("token")][0] == 1050
+
+
+@pytest.mark.parametrize(
+    "claims",
+    [
+        {"user_id": 1, "exp": int(time.time()) - 1},
+        {"user_id": 1, "exp": int(time.time()) + 60, "nbf": int(time.time()) + 60},
+        {"exp": int(time.time()) + 60},
+    ],
+)
+def test_get_current_user_id_401(claims):
+    """Просроченный, еще не действующий и токен без user_id дают 401"""
+    with pytest.raises(HTTPException) as exc:
+        note_api.get_current_user_id(make_token(**claims))
+    assert exc.value.status_code == 401
+    with pytest.raises(HTTPException):
+        note_api.get_current_user_id(make_token(**claims))
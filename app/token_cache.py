@@ -0,0 +1,155 @@
+"""Кэш проверенных JWT-токенов.
+
+Бот присылает один и тот же токен на каждый запрос, поэтому результат
+jwt.decode (проверенные claims) кэшируется по sha256 токена до его exp.
+Невалидные токены не кэшируются: для них каждый раз выполняется полная
+проверка и возвращается тот же 401, что и без кэша.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10000))
+# Проверка nbf выполняется jose при декодировании, iat - дополнительно
+TOKEN_VERIFY_NBF = os.getenv("TOKEN_VERIFY_NBF", "true").lower() in ("1", "true")
+TOKEN_VERIFY_IAT = os.getenv("TOKEN_VERIFY_IAT", "false").lower() in ("1", "true")
+# Максимальный возраст токена по iat в секундах, 0 - без ограничения
+TOKEN_MAX_AGE = int(os.getenv("TOKEN_MAX_AGE", 0))
+# Допустимое расхождение часов в секундах
+TOKEN_LEEWAY = int(os.getenv("TOKEN_LEEWAY", 0))
+
+
+class TokenClaimsError(Exception):
+    """Claims токена не прошли дополнительные проверки"""
+
+
+class TokenCache:
+    """LRU-кэш claims по дайджесту токена; запись живет до exp токена.
+
+    Зависимость get_current_user_id синхронная и выполняется в пуле потоков,
+    поэтому доступ к словарю защищен блокировкой.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = TOKEN_CACHE_MAX_ENTRIES,
+        verify_iat: bool = TOKEN_VERIFY_IAT,
+        max_age: int = TOKEN_MAX_AGE,
+        leeway: int = TOKEN_LEEWAY,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.verify_iat = verify_iat
+        self.max_age = max_age
+        self.leeway = leeway
+        self.clock = clock
+        self._data: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.decode_time = 0.0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def _expires_at(self, claims: dict) -> Optional[float]:
+        """Момент, до которого claims можно отдавать из кэша"""
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)):
+            # Бессрочные токены не кэшируем
+            return None
+        expires_at = float(exp)
+        iat = claims.get("iat")
+        if self.max_age and isinstance(iat, (int, float)):
+            expires_at = min(expires_at, iat + self.max_age + self.leeway)
+        return expires_at
+
+    def check_claims(self, claims: dict):
+        """Проверки iat, которых нет в jose: время выпуска и возраст токена"""
+        iat = claims.get("iat")
+        if not (self.verify_iat or self.max_age):
+            return
+        if not isinstance(iat, (int, float)):
+            raise TokenClaimsError("В токене нет iat")
+        now = self.clock()
+        if self.verify_iat and iat > now + self.leeway:
+            raise TokenClaimsError("Токен выпущен в будущем")
+        if self.max_age and now - iat > self.max_age + self.leeway:
+            raise TokenClaimsError("Токен слишком старый")
+
+    def get(self, token: str) -> Optional[dict]:
+        if not self.max_entries:
+            return None
+        key = self._key(token)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, claims = item
+            if expires_at <= self.clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def set(self, token: str, claims: dict):
+        if not self.max_entries:
+            return
+        expires_at = self._expires_at(claims)
+        if expires_at is None or expires_at <= self.clock():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._data[key] = (expires_at, claims)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def verify(self, token: str, decode: Callable[[str], dict]) -> dict:
+        """Claims токена из кэша или через decode с последующей проверкой.
+
+        Исключения decode и TokenClaimsError пробрасываются вызывающему.
+        """
+        claims = self.get(token)
+        if claims is not None:
+            return claims
+        started = time.perf_counter()
+        try:
+            claims = decode(token)
+        finally:
+            with self._lock:
+                self.misses += 1
+                self.decode_time += time.perf_counter() - started
+        self.check_claims(claims)
+        self.set(token, claims)
+        return claims
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        avg_decode = self.decode_time / self.misses if self.misses else 0.0
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "avg_decode_seconds": avg_decode,
+            # Оценка: каждое попадание сэкономило в среднем один jwt.decode
+            "decode_seconds_saved": avg_decode * self.hits,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+
+token_cache = TokenCache()
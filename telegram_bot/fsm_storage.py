@@ -0,0 +1,177 @@
+"""Хранилище состояний диалогов (FSM) диспетчера.
+
+Выбирается переменной BOT_FSM_STORAGE:
+    memory://             - в памяти процесса (по умолчанию), теряется при перезапуске
+    sqlite:///data/fsm.db - файл SQLite, переживает перезапуск одного экземпляра бота
+    redis://host:6379/1   - Redis или совместимый сервер, общий для нескольких
+                            реплик бота (нужен пакет redis)
+
+Незавершенный диалог (/create_note, /login и т.д.) удаляется через BOT_FSM_TTL
+секунд после последнего шага: в Redis - по TTL ключей, в SQLite - просроченные
+строки не читаются и периодически удаляются.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from aiogram.fsm.storage.memory import MemoryStorage
+from loguru import logger
+
+
+BOT_FSM_STORAGE = os.getenv("BOT_FSM_STORAGE", "memory://")
+# 0 - диалоги не истекают
+BOT_FSM_TTL = float(os.getenv("BOT_FSM_TTL", 86400))
+# Как часто удалять просроченные диалоги из SQLite
+BOT_FSM_CLEANUP_INTERVAL = float(os.getenv("BOT_FSM_CLEANUP_INTERVAL", 600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    expires_at REAL
+)
+"""
+# Истекший диалог при следующем шаге начинается с пустыми данными
+UPSERT_STATE = """
+INSERT INTO fsm (key, state, data, expires_at) VALUES (:key, :state, '{}', :expires_at)
+ON CONFLICT (key) DO UPDATE SET
+    state = excluded.state,
+    data = CASE WHEN fsm.expires_at <= :now THEN '{}' ELSE fsm.data END,
+    expires_at = excluded.expires_at
+"""
+UPSERT_DATA = """
+INSERT INTO fsm (key, state, data, expires_at) VALUES (:key, NULL, :data, :expires_at)
+ON CONFLICT (key) DO UPDATE SET
+    state = CASE WHEN fsm.expires_at <= :now THEN NULL ELSE fsm.state END,
+    data = excluded.data,
+    expires_at = excluded.expires_at
+"""
+SELECT = "SELECT state, data FROM fsm WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)"
+# Пустая запись (диалог завершен через state.clear()) не хранится
+DELETE_EMPTY = "DELETE FROM fsm WHERE key = ? AND state IS NULL AND data = '{}'"
+DELETE_EXPIRED = "DELETE FROM fsm WHERE expires_at <= ?"
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM в файле SQLite для бота на одном узле.
+
+    Запросы выполняются в отдельном потоке, чтобы запись на диск не
+    блокировала event loop; один поток - одно соединение, запросы по очереди.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = BOT_FSM_TTL,
+        cleanup_interval: float = BOT_FSM_CLEANUP_INTERVAL,
+        key_builder: Optional[KeyBuilder] = None,
+        clock=time.time,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm")
+        self._connection = self._executor.submit(self._connect).result()
+        self._next_cleanup = 0.0
+        self.cleanup()
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        # WAL: чтение не ждет записи, коммит без fsync на каждый шаг диалога
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(SCHEMA)
+        connection.commit()
+        return connection
+
+    async def _run(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    def _expires_at(self, now: float) -> Optional[float]:
+        return now + self.ttl if self.ttl > 0 else None
+
+    def _write(self, statement: str, key: str, **params):
+        now = self.clock()
+        with self._connection:
+            self._connection.execute(
+                statement,
+                {"key": key, "now": now, "expires_at": self._expires_at(now), **params},
+            )
+            self._connection.execute(DELETE_EMPTY, (key,))
+        if now >= self._next_cleanup:
+            self._cleanup(now)
+
+    def _read(self, key: str) -> Optional[tuple]:
+        return self._connection.execute(SELECT, (key, self.clock())).fetchone()
+
+    def _cleanup(self, now: float) -> int:
+        self._next_cleanup = now + self.cleanup_interval
+        with self._connection:
+            deleted = self._connection.execute(DELETE_EXPIRED, (now,)).rowcount
+        if deleted:
+            logger.info(f"Удалено незавершенных диалогов: {deleted}")
+        return deleted
+
+    def cleanup(self) -> int:
+        """Удаление просроченных диалогов; вызывается и при записи раз в интервал"""
+        return self._executor.submit(self._cleanup, self.clock()).result()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        await self._run(
+            lambda: self._write(UPSERT_STATE, self.key_builder.build(key), state=state)
+        )
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await self._run(self._read, self.key_builder.build(key))
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        data = json.dumps(data, ensure_ascii=False)
+        await self._run(
+            lambda: self._write(UPSERT_DATA, self.key_builder.build(key), data=data)
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await self._run(self._read, self.key_builder.build(key))
+        return json.loads(row[1]) if row else {}
+
+    async def close(self) -> None:
+        if self._connection is None:
+            return
+        await self._run(self._connection.close)
+        self._connection = None
+        self._executor.shutdown(wait=True)
+
+
+def create_storage(uri: str = BOT_FSM_STORAGE, ttl: float = BOT_FSM_TTL) -> BaseStorage:
+    if uri.startswith("sqlite:///"):
+        return SQLiteStorage(uri.removeprefix("sqlite:///"), ttl=ttl)
+    if uri.startswith(("redis://", "rediss://", "unix://")):
+        # Необязательная зависимость: нужна только при хранилище в Redis
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        expiry = int(ttl) if ttl > 0 else None
+        return RedisStorage.from_url(uri, state_ttl=expiry, data_ttl=expiry)
+    if uri == "memory://":
+        return MemoryStorage()
+    raise ValueError(f"Неизвестное хранилище FSM: {uri}")
@@ -51,7 +51,7 @@ async def handle_tags(message: Message, state: FSMContext, user: AccessTokenResp
     user_data = await state.get_data()
     title = user_data.get("title")
     content = user_data.get("content")
-    tags = message.text.split(",") if message.text else []
+    tags = [tag.strip() for tag in message.text.split(",")] if message.text else []
 
     note_data = NoteCreate(title=title, content=content, tags=tags)
 
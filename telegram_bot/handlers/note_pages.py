@@ -0,0 +1,221 @@
+"""Постраничный просмотр заметок с кнопками ◀️/▶️.
+
+Списки (/get_all_notes, /search_notes) запрашивают у API одну страницу из
+BOT_NOTES_PAGE_SIZE заметок с превью содержимого. Кнопки редактируют то же
+сообщение. Курсоры страниц и отрисованные страницы хранятся в памяти по
+(chat_id, message_id): отрисованная страница живет BOT_PAGE_CACHE_TTL
+секунд, поэтому возврат на просмотренную страницу не обращается к API.
+"""
+
+import os
+import time
+from html import escape
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from provider import provider_note
+from provider.models import AccessTokenResponse, NoteSummary
+
+
+# Больше 20 заметок в худшем случае не помещаются в одно сообщение
+BOT_NOTES_PAGE_SIZE = min(int(os.getenv("BOT_NOTES_PAGE_SIZE", 5)), 20)
+BOT_NOTE_PREVIEW = int(os.getenv("BOT_NOTE_PREVIEW", 300))
+BOT_PAGE_CACHE_TTL = float(os.getenv("BOT_PAGE_CACHE_TTL", 120))
+# Сколько открытых списков помнить; более старые кнопки перестают работать
+BOT_PAGE_SESSIONS = int(os.getenv("BOT_PAGE_SESSIONS", 10000))
+
+MESSAGE_LIMIT = 4096
+TITLE_LIMIT = 200
+TAGS_LIMIT = 200
+# До какой длины можно укорачивать заголовок заметки, чтобы страница поместилась
+TITLE_MIN = 10
+NOT_AUTHORIZED = (
+    "Вы не авторизованы. Пожалуйста, войдите в систему с помощью команды /login."
+)
+
+router = Router()
+
+
+class NotesPageCallback(CallbackData, prefix="notes"):
+    page: int
+
+
+class NoteBrowser:
+    """Открытый список: параметры запроса, курсоры и отрисованные страницы"""
+
+    def __init__(self, title: str, tags: Optional[List[str]] = None, match="all"):
+        self.title = title
+        self.tags = tags
+        self.match = match
+        # Кто открыл список: в группе кнопки видят все участники чата
+        self.owner_id: Optional[int] = None
+        # cursors[n] - курсор after для страницы n
+        self.cursors: List[Optional[str]] = [None]
+        self.pages = {}
+
+    def cached(self, page: int) -> Optional[Tuple[str, bool]]:
+        entry = self.pages.get(page)
+        if entry is None or time.monotonic() - entry[2] > BOT_PAGE_CACHE_TTL:
+            return None
+        return entry[0], entry[1]
+
+    async def load(self, token: str, page: int) -> Optional[Tuple[str, bool]]:
+        """Текст страницы и есть ли следующая; None - ошибка API"""
+        cached = self.cached(page)
+        if cached is not None:
+            return cached
+        result = await provider_note.get_notes_page(
+            token,
+            after=self.cursors[page],
+            limit=BOT_NOTES_PAGE_SIZE,
+            preview=BOT_NOTE_PREVIEW,
+            tags=self.tags,
+            match=self.match,
+        )
+        if result is None:
+            return None
+        del self.cursors[page + 1 :]
+        if result.next_cursor:
+            self.cursors.append(result.next_cursor)
+        has_next = result.next_cursor is not None
+        text = render_page(self.title, result.notes, page) if result.notes else ""
+        self.pages[page] = (text, has_next, time.monotonic())
+        return text, has_next
+
+
+class BrowserStore:
+    def __init__(self, max_sessions: int = BOT_PAGE_SESSIONS):
+        self.max_sessions = max_sessions
+        self._browsers: "OrderedDict[tuple, NoteBrowser]" = OrderedDict()
+
+    def add(self, message: Message, browser: NoteBrowser):
+        self._browsers[(message.chat.id, message.message_id)] = browser
+        while len(self._browsers) > self.max_sessions:
+            self._browsers.popitem(last=False)
+
+    def get(self, message: Message) -> Optional[NoteBrowser]:
+        key = (message.chat.id, message.message_id)
+        browser = self._browsers.get(key)
+        if browser is not None:
+            self._browsers.move_to_end(key)
+        return browser
+
+
+browsers = BrowserStore()
+
+
+def shorten(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def render_note(note: NoteSummary, budget: int) -> str:
+    """Заметка в HTML не длиннее budget (если это возможно).
+
+    Укорачивается исходный текст до экранирования, поэтому разметка и
+    HTML-сущности никогда не разрезаются.
+    """
+    content = note.content_preview or ""
+    tags = ", ".join(note.tags) if note.tags else ""
+    # API отдает не больше BOT_NOTE_PREVIEW символов содержимого
+    if len(content) >= BOT_NOTE_PREVIEW:
+        content += "…"
+    content_limit = len(content)
+    tags_limit = min(len(tags), TAGS_LIMIT)
+    title_limit = min(len(note.title or ""), TITLE_LIMIT)
+    updated = note.updated_at.strftime("%d.%m.%Y %H:%M") if note.updated_at else ""
+    while True:
+        title = shorten(note.title or "", title_limit)
+        text = (
+            f"📝 <b>{escape(title, quote=False)}</b> (ID <code>{note.id}</code>)\n"
+            f"{escape(shorten(content, content_limit), quote=False)}\n"
+            f"<b>Теги:</b> "
+            f"{escape(shorten(tags, tags_limit), quote=False) if tags else 'Нет тегов'}\n"
+            f"<i>Обновлена {updated}</i>"
+        )
+        if len(text) <= budget:
+            return text
+        # Сначала сокращается превью, затем теги, затем заголовок
+        if content_limit > 0:
+            content_limit //= 2
+        elif tags_limit > 0:
+            tags_limit //= 2
+        elif title_limit > TITLE_MIN:
+            title_limit = max(title_limit // 2, TITLE_MIN)
+        else:
+            return text
+
+
+def render_page(title: str, notes: List[NoteSummary], page: int) -> str:
+    header = (
+        f"📚 <b>{escape(shorten(title, TITLE_LIMIT), quote=False)}</b>, "
+        f"страница {page + 1}\n\n"
+    )
+    separators = 2 * (len(notes) - 1)
+    # Поровну на каждую заметку; короткие заметки не сокращаются
+    budget = (MESSAGE_LIMIT - len(header) - separators) // len(notes)
+    return header + "\n\n".join(render_note(note, budget) for note in notes)
+
+
+def keyboard(page: int, has_next: bool) -> Optional[InlineKeyboardMarkup]:
+    builder = InlineKeyboardBuilder()
+    if page > 0:
+        builder.button(text="◀️", callback_data=NotesPageCallback(page=page - 1))
+    if has_next:
+        builder.button(text="▶️", callback_data=NotesPageCallback(page=page + 1))
+    return builder.as_markup() if page > 0 or has_next else None
+
+
+async def send_notes(
+    message: Message, token: str, browser: NoteBrowser, empty_text: str
+):
+    """Первая страница списка новым сообщением"""
+    loaded = await browser.load(token, 0)
+    if loaded is None:
+        await message.answer("Не удалось получить заметки. Попробуйте позже.")
+        return
+    text, has_next = loaded
+    if not text:
+        await message.answer(empty_text)
+        return
+    sent = await message.answer(
+        text, parse_mode="HTML", reply_markup=keyboard(0, has_next)
+    )
+    if has_next:
+        browser.owner_id = message.from_user.id if message.from_user else None
+        browsers.add(sent, browser)
+
+
+@router.callback_query(NotesPageCallback.filter())
+async def handle_page(
+    callback: CallbackQuery,
+    callback_data: NotesPageCallback,
+    user: Optional[AccessTokenResponse],
+):
+    if not user:
+        await callback.answer(NOT_AUTHORIZED, show_alert=True)
+        return
+    browser = browsers.get(callback.message) if callback.message else None
+    page = callback_data.page
+    if browser is None or page >= len(browser.cursors):
+        await callback.answer("Список устарел, запросите его снова.", show_alert=True)
+        return
+    if callback.from_user.id != browser.owner_id:
+        await callback.answer("Это не ваш список заметок.", show_alert=True)
+        return
+    loaded = await browser.load(user.access_token, page)
+    if loaded is None or not loaded[0]:
+        await callback.answer("Не удалось получить заметки. Попробуйте позже.")
+        return
+    text, has_next = loaded
+    try:
+        await callback.message.edit_text(
+            text, parse_mode="HTML", reply_markup=keyboard(page, has_next)
+        )
+    except TelegramBadRequest:
+        # Повторное нажатие: сообщение уже показывает эту страницу
+        pass
+    await callback.answer()
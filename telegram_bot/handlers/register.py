@@ -5,6 +5,7 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 from provider import provider_user
 from provider.models import AccessTokenResponse
+from token_cache import token_cache
 
 
 # Создаем отдельные стейты для регистрации
@@ -46,6 +47,8 @@ async def handle_register_password(message: Message, state: FSMContext):
     login = user_data.get("login")
     password = message.text
     user = await provider_user.create_user(login, password, message.from_user.id)
+    # Следующее сообщение получит токен нового пользователя
+    token_cache.evict(message.from_user.id)
     if not user:
         await message.answer(f"Ошибка регистрации")
     else:
@@ -3,8 +3,8 @@ from aiogram.filters import Command, StateFilter
 from aiogram.types import Message
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
-from provider import provider_note
 from provider.models import AccessTokenResponse
+from handlers.note_pages import NoteBrowser, send_notes
 
 
 class SearchNoteStates(StatesGroup):
@@ -24,7 +24,11 @@ async def start_search_note_handler(
         )
         return
     await message.answer(
-        "Для отмены действия /cancel.\n\nВведите тег для поиска заметок:"
+        "Для отмены действия /cancel.\n\n"
+        "Введите теги для поиска заметок через запятую.\n"
+        "Будут найдены заметки со всеми тегами; чтобы искать по любому из них, "
+        "начните ввод с <code>any:</code>",
+        parse_mode="HTML",
     )
     await state.set_state(SearchNoteStates.waiting_for_tag)
 
@@ -32,27 +36,20 @@ async def start_search_note_handler(
 # Обработчик ввода тега и поиск заметок через API
 @router.message(StateFilter(SearchNoteStates.waiting_for_tag))
 async def handle_tag(message: Message, state: FSMContext, user: AccessTokenResponse):
-    tag = message.text
-
-    notes = await provider_note.search_notes_by_tag(user.access_token, tag)
-
-    if notes:
-        notes_summary = [
-            f"📝 <b>Заметка ID:</b> <code>{note.id}</code>\n"
-            f"<b>Заголовок:</b> <i>{note.title}</i>\n"
-            f"<b>Содержимое:</b> <i>{note.content}</i>\n"
-            f"<b>Теги:</b> {', '.join(note.tags) if note.tags else 'Нет тегов'}\n"
-            f"<b>Создана:</b> <i>{note.created_at.strftime('%d.%m.%Y %H:%M:%S')}</i>\n"
-            f"<b>Обновлена:</b> <i>{note.updated_at.strftime('%d.%m.%Y %H:%M:%S')}</i>\n"
-            f"{'-'*40}\n"
-            for note in notes
-        ]
-        result = "\n".join(notes_summary)
-        await message.answer(
-            f"📚 <b>Количество заметок:</b> <code>{len(notes)}</code>\n\n{result}",
-            parse_mode="HTML",
-        )
-    else:
-        await message.answer(f"📭 Заметки с тегом {tag} не найдены.")
+    text = message.text or ""
+    match = "all"
+    if text.lower().startswith("any:"):
+        match, text = "any", text[len("any:") :]
+    tags = [tag.strip() for tag in text.split(",") if tag.strip()]
+    if not tags:
+        await message.answer("Введите хотя бы один тег.")
+        return
+
+    await send_notes(
+        message,
+        user.access_token,
+        NoteBrowser(f"Заметки с тегами {', '.join(tags)}", tags, match),
+        f"📭 Заметки с тегами {', '.join(tags)} не найдены.",
+    )
 
     await state.clear()
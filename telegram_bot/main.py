@@ -10,16 +10,27 @@ from handlers import (
     create_note,
     search_notes,
     get_all_notes,
+    note_pages,
     update_note,
     delete_note,
 )
-from middleware import UserMiddleware
+from middleware import MetricsMiddleware, UserMiddleware
+from fsm_storage import create_storage
+from metrics import start_metrics_server
+from provider.client import api_client
+from token_cache import token_cache
+from webhook import BOT_WEBHOOK_URL, run_webhook
 from aiogram.types import BotCommand
 
 
 bot = Bot(os.getenv("BOT_TOKEN"))
-dp = Dispatcher()
+# Состояния диалогов: в памяти, в SQLite или в Redis (BOT_FSM_STORAGE)
+dp = Dispatcher(storage=create_storage())
 dp.message.outer_middleware(UserMiddleware())
+dp.callback_query.outer_middleware(UserMiddleware())
+# Внутренние middleware диспетчера действуют и на обработчики вложенных роутеров
+dp.message.middleware(MetricsMiddleware())
+dp.callback_query.middleware(MetricsMiddleware())
 
 #
 # @dp.error()
@@ -53,10 +64,11 @@ async def set_bot_commands():
 
 async def main():
     try:
+        start_metrics_server()
+        # Одна HTTP-сессия с пулом соединений к API на весь процесс
+        await api_client.start()
         # установка пользовательских команд
         await set_bot_commands()
-        # Для пропуска ивентов которые пришли, когда бот был неактивен
-        await bot.delete_webhook(drop_pending_updates=True)
         # добавляем обработчики
         dp.include_routers(
             commands.router,
@@ -67,18 +79,30 @@ async def main():
             delete_note.router,
             update_note.router,
             get_all_notes.router,
+            note_pages.router,
         )
 
         # Запуск бота
         bot_info = await bot.get_me()
         logger.info(f"Starting bot @{bot_info.username}[{bot_info.id}]")
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if BOT_WEBHOOK_URL:
+            await run_webhook(dp, bot)
+        else:
+            # Для пропуска ивентов которые пришли, когда бот был неактивен
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     except Exception as exc:
         logger.critical(exc)
         raise
     finally:
         logger.info("Stopping bot")
+        logger.info(f"Кэш токенов: {token_cache.stats()}")
+        await token_cache.close()
+        await api_client.close()
+        await dp.storage.close()
         await bot.session.close()
+        # Дописываем записи из очереди логов до выхода
+        await logger.complete()
 
 
 if __name__ == "__main__":
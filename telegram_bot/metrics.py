@@ -0,0 +1,74 @@
+"""Метрики Prometheus бота: время обработчиков и запросов к API.
+
+Отдаются HTTP-сервером prometheus_client на BOT_METRICS_PORT (0 - выключено).
+"""
+
+import os
+import time
+import functools
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from loguru import logger
+
+
+# Сервер метрик без авторизации, поэтому по умолчанию слушает только localhost
+BOT_METRICS_HOST = os.getenv("BOT_METRICS_HOST", "127.0.0.1")
+BOT_METRICS_PORT = int(os.getenv("BOT_METRICS_PORT", 9101))
+
+HANDLER_LATENCY = Histogram(
+    "bot_handler_duration_seconds",
+    "Время работы обработчика сообщения",
+    ["handler"],
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total", "Исключения в обработчиках", ["handler"]
+)
+PROVIDER_LATENCY = Histogram(
+    "bot_provider_request_duration_seconds",
+    "Время запроса к API заметок",
+    ["call"],
+)
+
+API_CONNECTIONS = Counter(
+    "bot_api_connections_total",
+    "Соединения с API: новые (new) и взятые из пула (reused)",
+    ["kind"],
+)
+API_POOL_WAIT = Histogram(
+    "bot_api_pool_wait_seconds", "Ожидание свободного соединения в пуле"
+)
+API_REQUESTS_IN_FLIGHT = Gauge(
+    "bot_api_requests_in_flight", "Выполняющиеся вызовы провайдеров API"
+)
+
+
+def handler_name(callback) -> str:
+    """Имя обработчика вида create_note.handle_title"""
+    module = callback.__module__.rpartition(".")[2]
+    return f"{module}.{callback.__name__}"
+
+
+def observe_provider(func):
+    """Замер времени вызова функции провайдера, метка call - имя функции.
+
+    Счетчик выполняющихся вызовов уменьшается в finally, поэтому не растет
+    от отмененных и прерванных таймаутом запросов.
+    """
+    histogram = PROVIDER_LATENCY.labels(func.__name__)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        API_REQUESTS_IN_FLIGHT.inc()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            API_REQUESTS_IN_FLIGHT.dec()
+            histogram.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def start_metrics_server():
+    if BOT_METRICS_PORT:
+        start_http_server(BOT_METRICS_PORT, BOT_METRICS_HOST)
+        logger.info(f"Метрики доступны на порту {BOT_METRICS_PORT}")
@@ -1,9 +1,12 @@
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
+import time
 from typing import Optional
+from metrics import HANDLER_ERRORS, HANDLER_LATENCY, handler_name
 from provider import provider_user
 from provider.models import AccessTokenResponse
+from token_cache import token_cache
 
 
 class UserMiddleware(BaseMiddleware):
@@ -14,8 +17,29 @@ class UserMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        user: Optional[AccessTokenResponse] = await provider_user.login_by_telegram_id(
-            event.from_user.id
+        telegram_id = event.from_user.id
+        user: Optional[AccessTokenResponse] = await token_cache.get(
+            telegram_id, lambda: provider_user.login_by_telegram_id(telegram_id)
         )
         data["user"] = user
         return await handler(event, data)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Время работы обработчиков; внутренний middleware, видит выбранный handler"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = handler_name(data["handler"].callback)
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(name).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(name).observe(time.perf_counter() - start)
@@ -0,0 +1,114 @@
+"""Общий HTTP-клиент для запросов к API заметок.
+
+Одна aiohttp.ClientSession на процесс бота: соединения с API переиспользуются
+(keep-alive), поэтому вызов провайдера - один обмен запросом и ответом без
+нового TCP-соединения и DNS-запроса. Создается в main() при старте и
+закрывается в finally.
+"""
+
+import os
+import time
+import aiohttp
+from typing import Optional
+from loguru import logger
+from metrics import API_CONNECTIONS, API_POOL_WAIT
+from token_cache import token_cache
+
+
+# Всего соединений в пуле и соединений с одним хостом (API)
+API_POOL_LIMIT = int(os.getenv("API_POOL_LIMIT", 100))
+API_POOL_LIMIT_PER_HOST = int(os.getenv("API_POOL_LIMIT_PER_HOST", 30))
+# Сколько секунд держать простаивающее соединение открытым
+API_KEEPALIVE_TIMEOUT = float(os.getenv("API_KEEPALIVE_TIMEOUT", 30))
+# Таймауты запроса целиком и установки соединения (включая ожидание пула)
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", 10))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", 3))
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    """Метрики пула (новые и повторные соединения, ожидание свободного) и 401"""
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_end(session, context, params):
+        # Токен, отклоненный API, больше не выдается из кэша UserMiddleware
+        if params.response.status == 401:
+            authorization = params.headers.get("Authorization", "")
+            token_cache.evict_token(authorization.removeprefix("Bearer "))
+
+    async def on_connection_create_end(session, context, params):
+        API_CONNECTIONS.labels("new").inc()
+
+    async def on_connection_reuseconn(session, context, params):
+        API_CONNECTIONS.labels("reused").inc()
+
+    async def on_connection_queued_start(session, context, params):
+        context.queued_at = time.perf_counter()
+
+    async def on_connection_queued_end(session, context, params):
+        API_POOL_WAIT.observe(time.perf_counter() - context.queued_at)
+
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_connection_queued_start.append(on_connection_queued_start)
+    trace_config.on_connection_queued_end.append(on_connection_queued_end)
+    return trace_config
+
+
+class ApiClient:
+    def __init__(
+        self,
+        limit: int = API_POOL_LIMIT,
+        limit_per_host: int = API_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = API_KEEPALIVE_TIMEOUT,
+        timeout: float = API_TIMEOUT,
+        connect_timeout: float = API_CONNECT_TIMEOUT,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=self.timeout,
+            trace_configs=[_trace_config()],
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Если start() не вызывали (скрипты, тесты), сессия создается при первом запросе
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    async def start(self):
+        """Создание сессии при старте бота, в работающем event loop"""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        logger.info(f"HTTP-клиент API: {self.stats()}")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+            "timeout": self.timeout.total,
+            "connect_timeout": self.timeout.connect,
+        }
+
+
+api_client = ApiClient()
@@ -34,3 +34,24 @@ class NoteResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class NoteSummary(BaseModel):
+    # Проекция заметки для списков: только запрошенные поля
+    id: int
+    title: Optional[str] = None
+    content_preview: Optional[str] = None
+    tags: Optional[List[str]] = None
+    updated_at: Optional[datetime] = None
+
+
+class NotePage(BaseModel):
+    notes: List[NoteSummary]
+    # Курсор следующей страницы (заголовок X-Next-Cursor), None - страница последняя
+    next_cursor: Optional[str] = None
+
+
+class NoteList(BaseModel):
+    notes: List[NoteResponse]
+    # API ответил 429 посреди списка: отданы только уже полученные страницы
+    truncated: bool = False
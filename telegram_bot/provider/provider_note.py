@@ -1,150 +1,265 @@
 import os
-import aiohttp
 from loguru import logger
-from typing import List, Optional
-from .models import NoteResponse, NoteCreate, NoteUpdate
+from metrics import observe_provider
+from .client import api_client
+from config import log_filter
+from typing import List, Optional, Tuple
+from .models import NoteResponse, NoteCreate, NoteUpdate, NoteList, NotePage
 
 
 BASE_URL = f"http://{os.getenv('HOST_APP')}:{os.getenv('PORT_APP')}/api"
+# Размер страницы при выгрузке всего списка: не больше NOTES_MAX_PAGE_SIZE API.
+# Каждая страница - отдельный запрос под лимитом 20/minute
+BOT_NOTES_FETCH_LIMIT = int(os.getenv("BOT_NOTES_FETCH_LIMIT", 1000))
 
 
+async def _fetch_all_pages(
+    url: str, headers: dict, params=()
+) -> Tuple[int, list, bool]:
+    """Все страницы списка заметок: запросы повторяются по X-Next-Cursor.
+
+    Возвращает статус, собранные заметки и признак обрезанного списка: если
+    лимит запросов API (429) исчерпан посреди списка, отдаются уже
+    полученные страницы.
+    """
+    session = api_client.session
+    notes = []
+    after = None
+    while True:
+        page_params = list(params) + [("limit", BOT_NOTES_FETCH_LIMIT)]
+        if after:
+            page_params.append(("after", after))
+        async with session.get(url, headers=headers, params=page_params) as response:
+            if response.status != 200:
+                # Страница за курсором опустела (заметки удалили) - список закончен
+                if notes and response.status == 404:
+                    return 200, notes, False
+                if notes and response.status == 429:
+                    logger.warning(
+                        "Лимит запросов API исчерпан, список обрезан: {} заметок",
+                        len(notes),
+                    )
+                    return 200, notes, True
+                if log_filter.enabled("DEBUG", __name__):
+                    logger.debug("Тело ответа: {}", await response.text())
+                return response.status, notes, False
+            notes += await response.json()
+            after = response.headers.get("X-Next-Cursor")
+        if not after:
+            return 200, notes, False
+
+
+@observe_provider
 async def create_note(token: str, note_data: NoteCreate) -> Optional[NoteResponse]:
     url = f"{BASE_URL}/notes/"
     headers = {"Authorization": f"Bearer {token}"}
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            logger.info("Отправка запроса на создание заметки")
-            async with session.post(
-                url, json=note_data.dict(), headers=headers
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"Заметка успешно создана: {data}")
-                    return NoteResponse(**data)
-                else:
-                    logger.error(
-                        f"Ошибка при создании заметки. Статус: {response.status}"
-                    )
-                    logger.debug(f"Тело ответа: {await response.text()}")
-        except Exception as e:
-            logger.error(f"Исключение при создании заметки: {e}")
+    session = api_client.session
+    try:
+        logger.info("Отправка запроса на создание заметки")
+        async with session.post(
+            url, json=note_data.dict(), headers=headers
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                logger.info(f"Заметка {data['id']} успешно создана")
+                logger.debug("Ответ API: {}", data)
+                return NoteResponse(**data)
+            else:
+                logger.error(f"Ошибка при создании заметки. Статус: {response.status}")
+                if log_filter.enabled("DEBUG", __name__):
+                    logger.debug("Тело ответа: {}", await response.text())
+    except Exception as e:
+        logger.error(f"Исключение при создании заметки: {e}")
 
 
+@observe_provider
 async def read_note(token: str, note_id: int) -> Optional[NoteResponse]:
     url = f"{BASE_URL}/notes/{note_id}"
     headers = {"Authorization": f"Bearer {token}"}
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            logger.info(f"Отправка запроса на получение заметки с ID: {note_id}")
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"Заметка успешно получена: {data}")
-                    return NoteResponse(**data)
-                elif response.status == 404:
-                    logger.warning(f"Заметка с ID {note_id} не найдена")
-                else:
-                    logger.error(
-                        f"Ошибка при получении заметки. Статус: {response.status}"
-                    )
-                    logger.debug(f"Тело ответа: {await response.text()}")
-        except Exception as e:
-            logger.error(f"Исключение при получении заметки: {e}")
+    session = api_client.session
+    try:
+        logger.info(f"Отправка запроса на получение заметки с ID: {note_id}")
+        async with session.get(url, headers=headers) as response:
+            if response.status == 200:
+                data = await response.json()
+                logger.info(f"Заметка с ID {note_id} успешно получена")
+                logger.debug("Ответ API: {}", data)
+                return NoteResponse(**data)
+            elif response.status == 404:
+                logger.warning(f"Заметка с ID {note_id} не найдена")
+            else:
+                logger.error(f"Ошибка при получении заметки. Статус: {response.status}")
+                if log_filter.enabled("DEBUG", __name__):
+                    logger.debug("Тело ответа: {}", await response.text())
+    except Exception as e:
+        logger.error(f"Исключение при получении заметки: {e}")
 
 
+@observe_provider
 async def update_note(
     token: str, note_id: int, note_data: NoteUpdate
 ) -> Optional[NoteResponse]:
     url = f"{BASE_URL}/notes/{note_id}"
     headers = {"Authorization": f"Bearer {token}"}
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            logger.info(f"Отправка запроса на обновление заметки с ID: {note_id}")
-            async with session.put(
-                url, json=note_data.dict(exclude_unset=True), headers=headers
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"Заметка успешно обновлена: {data}")
-                    return NoteResponse(**data)
-                elif response.status == 404:
-                    logger.warning(f"Заметка с ID {note_id} не найдена")
-                else:
-                    logger.error(
-                        f"Ошибка при обновлении заметки. Статус: {response.status}"
-                    )
-                    logger.debug(f"Тело ответа: {await response.text()}")
-        except Exception as e:
-            logger.error(f"Исключение при обновлении заметки: {e}")
+    session = api_client.session
+    try:
+        logger.info(f"Отправка запроса на обновление заметки с ID: {note_id}")
+        async with session.put(
+            url, json=note_data.dict(exclude_unset=True), headers=headers
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                logger.info(f"Заметка с ID {note_id} успешно обновлена")
+                logger.debug("Ответ API: {}", data)
+                return NoteResponse(**data)
+            elif response.status == 404:
+                logger.warning(f"Заметка с ID {note_id} не найдена")
+            else:
+                logger.error(
+                    f"Ошибка при обновлении заметки. Статус: {response.status}"
+                )
+                if log_filter.enabled("DEBUG", __name__):
+                    logger.debug("Тело ответа: {}", await response.text())
+    except Exception as e:
+        logger.error(f"Исключение при обновлении заметки: {e}")
 
 
+@observe_provider
 async def delete_note(token: str, note_id: int) -> bool:
     url = f"{BASE_URL}/notes/{note_id}"
     headers = {"Authorization": f"Bearer {token}"}
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            logger.info(f"Отправка запроса на удаление заметки с ID: {note_id}")
-            async with session.delete(url, headers=headers) as response:
-                if response.status == 200:
-                    logger.info(f"Заметка с ID {note_id} успешно удалена")
-                    return True
-                elif response.status == 404:
-                    logger.warning(f"Заметка с ID {note_id} не найдена")
-                else:
-                    logger.error(
-                        f"Ошибка при удалении заметки. Статус: {response.status}"
-                    )
-                    logger.debug(f"Тело ответа: {await response.text()}")
-        except Exception as e:
-            logger.error(f"Исключение при удалении заметки: {e}")
+    session = api_client.session
+    try:
+        logger.info(f"Отправка запроса на удаление заметки с ID: {note_id}")
+        async with session.delete(url, headers=headers) as response:
+            if response.status == 200:
+                logger.info(f"Заметка с ID {note_id} успешно удалена")
+                return True
+            elif response.status == 404:
+                logger.warning(f"Заметка с ID {note_id} не найдена")
+            else:
+                logger.error(f"Ошибка при удалении заметки. Статус: {response.status}")
+                if log_filter.enabled("DEBUG", __name__):
+                    logger.debug("Тело ответа: {}", await response.text())
+    except Exception as e:
+        logger.error(f"Исключение при удалении заметки: {e}")
     return False
 
 
-async def search_notes_by_tag(token: str, tag: str) -> List[NoteResponse]:
+@observe_provider
+async def search_notes_by_tag(token: str, tag: str) -> Optional[NoteList]:
     url = f"{BASE_URL}/notes/tag/{tag}"
     headers = {"Authorization": f"Bearer {token}"}
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            logger.info(f"Отправка запроса на поиск заметок с тегом '{tag}'")
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"Заметки с тегом '{tag}' успешно получены: {data}")
-                    return [NoteResponse(**note) for note in data]
-                elif response.status == 404:
-                    logger.warning(f"Заметки с тегом '{tag}' не найдены")
-                else:
-                    logger.error(
-                        f"Ошибка при поиске заметок с тегом '{tag}'. Статус: {response.status}"
-                    )
-                    logger.debug(f"Тело ответа: {await response.text()}")
-        except Exception as e:
-            logger.error(f"Исключение при поиске заметок с тегом '{tag}': {e}")
+    try:
+        logger.info(f"Отправка запроса на поиск заметок с тегом '{tag}'")
+        status, data, truncated = await _fetch_all_pages(url, headers)
+        if status == 200:
+            logger.info(f"Заметки с тегом '{tag}' успешно получены: {len(data)}")
+            logger.debug("Ответ API: {}", data)
+            return NoteList(
+                notes=[NoteResponse(**note) for note in data], truncated=truncated
+            )
+        elif status == 404:
+            logger.warning(f"Заметки с тегом '{tag}' не найдены")
+        else:
+            logger.error(f"Ошибка при поиске заметок с тегом '{tag}'. Статус: {status}")
+    except Exception as e:
+        logger.error(f"Исключение при поиске заметок с тегом '{tag}': {e}")
 
 
-async def get_all_notes(token: str) -> List[NoteResponse]:
+@observe_provider
+async def search_notes_by_tags(
+    token: str, tags: List[str], match: str = "all"
+) -> Optional[NoteList]:
+    """Поиск по нескольким тегам одним запросом: match=all (все теги) или any"""
+    url = f"{BASE_URL}/notes/tags"
+    headers = {"Authorization": f"Bearer {token}"}
+    params = [("tags", tag) for tag in tags] + [("match", match)]
+
+    try:
+        logger.info(f"Отправка запроса на поиск заметок с тегами {tags} ({match})")
+        status, data, truncated = await _fetch_all_pages(url, headers, params)
+        if status == 200:
+            logger.info(f"Заметки с тегами {tags} успешно получены: {len(data)}")
+            logger.debug("Ответ API: {}", data)
+            return NoteList(
+                notes=[NoteResponse(**note) for note in data], truncated=truncated
+            )
+        elif status == 404:
+            logger.warning(f"Заметки с тегами {tags} не найдены")
+        else:
+            logger.error(f"Ошибка при поиске заметок с тегами {tags}. Статус: {status}")
+    except Exception as e:
+        logger.error(f"Исключение при поиске заметок с тегами {tags}: {e}")
+
+
+@observe_provider
+async def get_all_notes(token: str) -> Optional[NoteList]:
     url = f"{BASE_URL}/notes/"
     headers = {"Authorization": f"Bearer {token}"}
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            logger.info(f"Отправка запроса на получение всех заметок")
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"Заметки успешно получены: {data}")
-                    return [NoteResponse(**note) for note in data]
-                elif response.status == 404:
-                    logger.warning(f"Заметки не найдены")
-                else:
-                    logger.error(
-                        f"Ошибка при получении заметок. Статус: {response.status}"
-                    )
-                    logger.debug(f"Тело ответа: {await response.text()}")
-        except Exception as e:
-            logger.error(f"Исключение при получении заметок: {e}")
+    try:
+        logger.info(f"Отправка запроса на получение всех заметок")
+        status, data, truncated = await _fetch_all_pages(url, headers)
+        if status == 200:
+            logger.info(f"Заметки успешно получены: {len(data)}")
+            logger.debug("Ответ API: {}", data)
+            return NoteList(
+                notes=[NoteResponse(**note) for note in data], truncated=truncated
+            )
+        elif status == 404:
+            logger.warning(f"Заметки не найдены")
+        else:
+            logger.error(f"Ошибка при получении заметок. Статус: {status}")
+    except Exception as e:
+        logger.error(f"Исключение при получении заметок: {e}")
+
+
+@observe_provider
+async def get_notes_page(
+    token: str,
+    after: Optional[str] = None,
+    limit: int = 5,
+    preview: int = 300,
+    tags: Optional[List[str]] = None,
+    match: str = "all",
+) -> Optional[NotePage]:
+    """Одна страница заметок (все или по тегам) с превью вместо содержимого"""
+    url = f"{BASE_URL}/notes/tags" if tags else f"{BASE_URL}/notes/"
+    headers = {"Authorization": f"Bearer {token}"}
+    params = [("limit", limit), ("preview", preview)]
+    params += [("fields", field) for field in ("title", "tags", "updated_at")]
+    if tags:
+        params += [("tags", tag) for tag in tags] + [("match", match)]
+    if after:
+        params.append(("after", after))
+
+    session = api_client.session
+    try:
+        logger.info(
+            f"Отправка запроса на страницу заметок (after={after}, tags={tags})"
+        )
+        async with session.get(url, headers=headers, params=params) as response:
+            if response.status == 200:
+                data = await response.json()
+                logger.info(f"Страница заметок получена: {len(data)}")
+                logger.debug("Ответ API: {}", data)
+                return NotePage(
+                    notes=data, next_cursor=response.headers.get("X-Next-Cursor")
+                )
+            elif response.status == 404:
+                logger.warning("Заметки не найдены")
+                return NotePage(notes=[])
+            else:
+                logger.error(
+                    f"Ошибка при получении страницы заметок. Статус: {response.status}"
+                )
+                if log_filter.enabled("DEBUG", __name__):
+                    logger.debug("Тело ответа: {}", await response.text())
+    except Exception as e:
+        logger.error(f"Исключение при получении страницы заметок: {e}")
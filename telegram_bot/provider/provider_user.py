@@ -1,54 +1,61 @@
 import os
+import asyncio
 import aiohttp
 from loguru import logger
+from metrics import observe_provider
+from .client import api_client
 from .models import UserCreate, AccessTokenResponse
 from typing import Union
 
 BASE_URL = f"http://{os.getenv('HOST_APP')}:{os.getenv('PORT_APP')}/api"
 
 
+@observe_provider
 async def create_user(
     username: str, password: str, telegram_id: int
 ) -> Union[UserCreate, None]:
     url = f"{BASE_URL}/register"
     payload = {"username": username, "password": password, "telegram_id": telegram_id}
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    user = UserCreate(**result)
-                    logger.info("Создание пользователя: %s", user)
-                    return user
-                else:
-                    error_message = await response.text()
-                    logger.error("Ошибка создания пользователя: %s", error_message)
-                    return None
-    except aiohttp.ClientError as e:
-        logger.error("Ошибка запроса: %s", e)
+        session = api_client.session
+        async with session.post(url, json=payload) as response:
+            if response.status == 200:
+                result = await response.json()
+                user = UserCreate(**result)
+                logger.info("Пользователь {} создан", user.username)
+                return user
+            else:
+                error_message = await response.text()
+                logger.error("Ошибка создания пользователя: {}", error_message)
+                return None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error("Ошибка запроса: {}", e)
         return None
 
 
+@observe_provider
 async def login_by_telegram_id(telegram_id: int) -> Union[AccessTokenResponse, None]:
     url = f"{BASE_URL}/login_by_telegram_id"
     payload = {"telegram_id": telegram_id}
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    access_token_response = AccessTokenResponse(**result)
-                    logger.info("Логин по Telegram ID: %s", access_token_response)
-                    return access_token_response
-                else:
-                    error_message = await response.text()
-                    logger.error("Ошибка логина по Telegram ID: %s", error_message)
-                    return None
-    except aiohttp.ClientError as e:
-        logger.error("Ошибка запроса: %s", e)
+        session = api_client.session
+        async with session.post(url, json=payload) as response:
+            if response.status == 200:
+                result = await response.json()
+                access_token_response = AccessTokenResponse(**result)
+                # Сам токен в лог не пишем
+                logger.info("Логин по Telegram ID {} выполнен", telegram_id)
+                return access_token_response
+            else:
+                error_message = await response.text()
+                logger.error("Ошибка логина по Telegram ID: {}", error_message)
+                return None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error("Ошибка запроса: {}", e)
         return None
 
 
+@observe_provider
 async def update_telegram_id(
     username: str, password: str, new_telegram_id: int
 ) -> Union[UserCreate, None]:
@@ -59,17 +66,17 @@ async def update_telegram_id(
         "telegram_id": new_telegram_id,
     }
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    user = UserCreate(**result)
-                    logger.info("Обновление Telegram ID: %s", user)
-                    return user
-                else:
-                    error_message = await response.text()
-                    logger.error("Ошибка обновления Telegram ID: %s", error_message)
-                    return None
-    except aiohttp.ClientError as e:
-        logger.error("Ошибка запроса: %s", e)
+        session = api_client.session
+        async with session.post(url, json=payload) as response:
+            if response.status == 200:
+                result = await response.json()
+                user = UserCreate(**result)
+                logger.info("Telegram ID пользователя {} обновлен", user.username)
+                return user
+            else:
+                error_message = await response.text()
+                logger.error("Ошибка обновления Telegram ID: {}", error_message)
+                return None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error("Ошибка запроса: {}", e)
         return None
@@ -0,0 +1,102 @@
+"""Хранилища FSM: SQLite на временном файле, Redis на fakeredis.
+
+    cd telegram_bot && python -m pytest -q tests/test_fsm_storage.py
+"""
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from fsm_storage import SQLiteStorage, create_storage
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+OTHER = StorageKey(bot_id=1, chat_id=20, user_id=20)
+
+
+class NoteStates(StatesGroup):
+    waiting_for_title = State()
+    waiting_for_content = State()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_sqlite_dialog_survives_restart(tmp_path):
+    path = str(tmp_path / "data" / "fsm.db")
+    storage = create_storage(f"sqlite:///{path}", ttl=3600)
+    assert isinstance(storage, SQLiteStorage)
+    await storage.set_state(KEY, NoteStates.waiting_for_content)
+    await storage.update_data(KEY, {"title": "Покупки"})
+    await storage.close()
+
+    storage = create_storage(f"sqlite:///{path}", ttl=3600)
+    assert await storage.get_state(KEY) == NoteStates.waiting_for_content.state
+    assert await storage.get_data(KEY) == {"title": "Покупки"}
+    assert await storage.get_state(OTHER) is None
+    assert await storage.get_data(OTHER) == {}
+
+    # state.clear(): пустая запись удаляется
+    await storage.set_state(KEY, None)
+    await storage.set_data(KEY, {})
+    assert storage._connection.execute("SELECT count(*) FROM fsm").fetchone() == (0,)
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_abandoned_dialog_expires(tmp_path):
+    clock = Clock()
+    storage = SQLiteStorage(
+        str(tmp_path / "fsm.db"), ttl=60, cleanup_interval=300, clock=clock
+    )
+    await storage.set_state(KEY, NoteStates.waiting_for_title)
+    await storage.update_data(KEY, {"title": "Старая"})
+    await storage.set_state(OTHER, NoteStates.waiting_for_title)
+
+    clock.now += 30
+    # Шаг диалога продлевает срок
+    await storage.set_state(OTHER, NoteStates.waiting_for_content)
+    clock.now += 40
+    assert await storage.get_state(KEY) is None
+    assert await storage.get_data(KEY) == {}
+    assert await storage.get_state(OTHER) == NoteStates.waiting_for_content.state
+
+    # Новый диалог после истечения не видит данных старого
+    await storage.set_state(KEY, NoteStates.waiting_for_title)
+    assert await storage.get_data(KEY) == {}
+
+    clock.now += 300
+    assert storage.cleanup() == 2
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_storage_shared_between_replicas():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    # Две реплики бота с одним сервером Redis
+    first = RedisStorage(fakeredis.FakeAsyncRedis(server=server), state_ttl=60)
+    second = RedisStorage(fakeredis.FakeAsyncRedis(server=server), state_ttl=60)
+
+    await first.set_state(KEY, NoteStates.waiting_for_content)
+    await first.update_data(KEY, {"title": "Покупки"})
+    assert await second.get_state(KEY) == NoteStates.waiting_for_content.state
+    assert await second.get_data(KEY) == {"title": "Покупки"}
+    assert 0 < await second.redis.ttl("fsm:10:10:state") <= 60
+
+    await first.close()
+    await second.close()
+
+
+def test_create_storage_by_uri():
+    assert type(create_storage("memory://")).__name__ == "MemoryStorage"
+    storage = create_storage("redis://localhost:6379/1", ttl=600)
+    assert isinstance(storage, RedisStorage)
+    assert storage.state_ttl == storage.data_ttl == 600
+    with pytest.raises(ValueError):
+        create_storage("mongodb://localhost")
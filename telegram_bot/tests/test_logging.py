@@ -0,0 +1,41 @@
+"""Фильтр логов бота (копия LogFilter из app/config.py).
+
+    cd telegram_bot && python -m pytest -q tests/test_logging.py
+"""
+
+from loguru import logger
+from config import LogFilter
+
+
+def make_record(name: str, level: str = "INFO", line: int = 1, **extra) -> dict:
+    return {"name": name, "level": logger.level(level), "line": line, "extra": extra}
+
+
+def test_module_levels():
+    """Уровень модуля наследуется от ближайшего заданного родителя"""
+    log_filter = LogFilter("INFO", "provider=WARNING, provider.client=DEBUG", "", 0)
+    assert not log_filter(make_record("provider.provider_note"))
+    assert log_filter(make_record("provider.provider_note", "ERROR"))
+    assert log_filter(make_record("provider.client", "DEBUG"))
+    assert not log_filter(make_record("handlers", "DEBUG"))
+    assert log_filter.enabled("DEBUG", "provider.client")
+    assert log_filter.lowest == logger.level("DEBUG").no
+
+
+def test_sampling_per_call_site(monkeypatch):
+    """Частая строка пишется не чаще rate раз в секунду, пропуски считаются"""
+    now = [100.0]
+    monkeypatch.setattr("config.time.monotonic", lambda: now[0])
+    log_filter = LogFilter("INFO", "", "middleware,provider", 3)
+    kept = [log_filter(make_record("provider.provider_note")) for _ in range(10)]
+    assert kept == [True] * 3 + [False] * 7
+    # Другое место в коде, предупреждения и модули без выборки пишутся всегда
+    assert log_filter(make_record("provider.provider_note", line=2))
+    assert log_filter(make_record("provider.provider_note", "WARNING"))
+    assert log_filter(make_record("handlers.get_all_notes"))
+
+    now[0] += 1
+    record = make_record("provider.provider_note")
+    assert log_filter(record)
+    assert record["extra"]["dropped"] == 7
+    assert log_filter(make_record("webhook", sample=True))
@@ -0,0 +1,23 @@
+import asyncio
+import pytest
+from metrics import API_REQUESTS_IN_FLIGHT, observe_provider
+
+
+@pytest.mark.asyncio
+async def test_in_flight_gauge_survives_cancellation():
+    """Отмененный вызов провайдера не оставляет счетчик выполняющихся завышенным"""
+    started = asyncio.Event()
+
+    @observe_provider
+    async def slow_call():
+        started.set()
+        await asyncio.sleep(10)
+
+    before = API_REQUESTS_IN_FLIGHT._value.get()
+    task = asyncio.create_task(slow_call())
+    await started.wait()
+    assert API_REQUESTS_IN_FLIGHT._value.get() == before + 1
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert API_REQUESTS_IN_FLIGHT._value.get() == before
@@ -0,0 +1,76 @@
+"""Постраничный просмотр заметок без Telegram и API: сообщения - заглушки.
+
+    cd telegram_bot && python -m pytest -q tests/test_note_pages.py
+"""
+
+import re
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+import pytest
+from handlers import note_pages
+from handlers.note_pages import NoteBrowser, NotesPageCallback, handle_page, render_page
+from provider.models import AccessTokenResponse, NoteSummary
+
+OWNER = 10
+OTHER = 20
+
+
+def make_message(message_id: int, from_id: int):
+    return SimpleNamespace(
+        chat=SimpleNamespace(id=-100),
+        message_id=message_id,
+        from_user=SimpleNamespace(id=from_id),
+        answer=AsyncMock(),
+        edit_text=AsyncMock(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_only_owner_can_page_group_listing(monkeypatch):
+    browser = NoteBrowser("Ваши заметки")
+    browser.cursors.append("cursor-1")
+    browser.pages[1] = ("страница 2", False, float("inf"))
+    sent = make_message(1, 0)
+    # send_notes запоминает автора команды
+    browser.owner_id = OWNER
+    note_pages.browsers.add(sent, browser)
+    load = AsyncMock()
+    monkeypatch.setattr(note_pages.provider_note, "get_notes_page", load)
+    user = AccessTokenResponse(access_token="token")
+
+    callback = SimpleNamespace(
+        message=sent, from_user=SimpleNamespace(id=OTHER), answer=AsyncMock()
+    )
+    await handle_page(callback, NotesPageCallback(page=1), user)
+    callback.answer.assert_awaited_once()
+    assert callback.answer.await_args.kwargs == {"show_alert": True}
+    sent.edit_text.assert_not_awaited()
+
+    callback.from_user = SimpleNamespace(id=OWNER)
+    await handle_page(callback, NotesPageCallback(page=1), user)
+    sent.edit_text.assert_awaited_once()
+    load.assert_not_awaited()
+
+
+def test_rendered_page_fits_message_limit():
+    """Худший случай: максимум заметок, длинные поля из символов с экранированием"""
+    long = "&<>" * 2000
+    notes = [
+        NoteSummary(
+            id=10**9 + index,
+            title=long,
+            content_preview="&" * note_pages.BOT_NOTE_PREVIEW,
+            tags=[long, long],
+            updated_at=datetime(2024, 9, 1, 12, 30),
+        )
+        for index in range(20)
+    ]
+    text = render_page(f"Заметки с тегами {long}", notes, 0)
+    assert len(text) <= note_pages.MESSAGE_LIMIT
+    # Обрезается исходный текст: все сущности и теги разметки целые
+    assert re.fullmatch(r"(?:[^&<]|&(?:amp|lt|gt);|</?(?:b|i|code)>)*", text)
+
+    # Короткая заметка выводится полностью
+    short = NoteSummary(id=1, title="a & b", content_preview="текст", tags=["x"])
+    assert "a &amp; b" in render_page("Ваши заметки", [short], 0)
@@ -0,0 +1,89 @@
+"""Выгрузка всего списка заметок по страницам без API: сессия - заглушка.
+
+    cd telegram_bot && python -m pytest -q tests/test_provider_note.py
+"""
+
+from datetime import datetime
+import pytest
+from provider import provider_note
+
+NOTE = {
+    "title": "Заметка",
+    "content": "Текст",
+    "tags": ["x"],
+    "created_at": datetime(2024, 9, 1).isoformat(),
+    "updated_at": datetime(2024, 9, 1).isoformat(),
+}
+
+
+class FakeResponse:
+    def __init__(self, status: int, notes=(), cursor=None):
+        self.status = status
+        self.notes = list(notes)
+        self.headers = {"X-Next-Cursor": cursor} if cursor else {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def json(self):
+        return self.notes
+
+    async def text(self):
+        return "{}"
+
+
+class FakeSession:
+    """Отдает заранее заданные ответы и запоминает параметры запросов"""
+
+    closed = False
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.params = []
+
+    def get(self, url, headers, params):
+        self.params.append(dict(params))
+        return self.responses.pop(0)
+
+
+def page(first_id: int, cursor=None):
+    notes = [{"id": first_id + index, **NOTE} for index in range(2)]
+    return FakeResponse(200, notes, cursor)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(*responses):
+        fake = FakeSession(responses)
+        monkeypatch.setattr(provider_note.api_client, "_session", fake)
+        return fake
+
+    return install
+
+
+@pytest.mark.asyncio
+async def test_all_pages_with_largest_page_size(session):
+    fake = session(page(1, "c1"), page(3, "c2"), page(5))
+    result = await provider_note.get_all_notes("token")
+    assert [note.id for note in result.notes] == [1, 2, 3, 4, 5, 6]
+    assert not result.truncated
+    assert [params.get("after") for params in fake.params] == [None, "c1", "c2"]
+    assert {params["limit"] for params in fake.params} == {
+        provider_note.BOT_NOTES_FETCH_LIMIT
+    }
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_midway_returns_collected_notes(session):
+    """429 посреди списка: пользователь получает уже собранные страницы"""
+    session(page(1, "c1"), page(3, "c2"), FakeResponse(429))
+    result = await provider_note.search_notes_by_tags("token", ["x", "y"], "any")
+    assert [note.id for note in result.notes] == [1, 2, 3, 4]
+    assert result.truncated
+
+    # 429 на первой странице - ошибка, а не пустой список
+    session(FakeResponse(429))
+    assert await provider_note.get_all_notes("token") is None
@@ -0,0 +1,155 @@
+"""Интеграционный тест webhook: синтетические обновления в локальный сервер.
+
+    cd telegram_bot && python -m pytest -q -s tests/test_webhook.py
+"""
+
+import time
+import asyncio
+import aiohttp
+import pytest
+from aiohttp.test_utils import TestServer
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from webhook import create_app
+
+SECRET = "test-secret"
+HEADERS = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+UPDATES = 2000
+MAX_CONCURRENT = 20
+
+
+def make_update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": update_id % 50, "type": "private"},
+            "from": {"id": update_id % 50, "is_bot": False, "first_name": "Тест"},
+            "text": f"сообщение {update_id}",
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_webhook_throughput_limit_and_graceful_shutdown():
+    handled = []
+    active = 0
+    max_active = 0
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.005)
+        active -= 1
+        handled.append(message.message_id)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = Bot("42:TEST")
+    app = create_app(
+        dp, bot, path="/webhook", secret_token=SECRET, max_concurrent=MAX_CONCURRENT
+    )
+    server = TestServer(app)
+    await server.start_server()
+    url = str(server.make_url("/webhook"))
+    headers = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.post(url, json=make_update(0)) as response:
+                assert response.status == 401
+
+            semaphore = asyncio.Semaphore(50)
+
+            async def post(update_id: int):
+                async with semaphore:
+                    async with session.post(
+                        url, json=make_update(update_id), headers=headers
+                    ) as response:
+                        assert response.status == 200
+
+            start = time.perf_counter()
+            await asyncio.gather(*(post(i) for i in range(1, UPDATES + 1)))
+            accepted = time.perf_counter() - start
+    finally:
+        # Остановка сервера ждет обновления, принятые до нее
+        await server.close()
+    elapsed = time.perf_counter() - start
+
+    assert sorted(handled) == list(range(1, UPDATES + 1))
+    assert max_active <= MAX_CONCURRENT
+    print(
+        f"\nwebhook: {UPDATES} обновлений, прием {UPDATES / accepted:.0f}/с, "
+        f"обработка {UPDATES / elapsed:.0f}/с"
+    )
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_updates_over_pending_limit():
+    release = asyncio.Event()
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message):
+        await release.wait()
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    app = create_app(
+        dp, Bot("42:TEST"), secret_token=SECRET, max_concurrent=2, max_pending=5
+    )
+    server = TestServer(app)
+    await server.start_server()
+    url = str(server.make_url("/webhook"))
+    try:
+        async with aiohttp.ClientSession() as session:
+            statuses = []
+            for update_id in range(1, 9):
+                async with session.post(
+                    url, json=make_update(update_id), headers=HEADERS
+                ) as response:
+                    statuses.append(response.status)
+            assert statuses == [200] * 5 + [503] * 3
+            release.set()
+            await asyncio.sleep(0.1)
+            async with session.post(
+                url, json=make_update(9), headers=HEADERS
+            ) as response:
+                assert response.status == 200
+    finally:
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_webhook_requires_secret():
+    """Без секрета приложение не создается, обновления без заголовка отклоняются"""
+    handled = []
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message):
+        handled.append(message.message_id)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = Bot("42:TEST")
+    for secret in ("", None, "bad secret"):
+        with pytest.raises(ValueError):
+            create_app(dp, bot, secret_token=secret)
+
+    server = TestServer(create_app(dp, bot, secret_token=SECRET))
+    await server.start_server()
+    url = str(server.make_url("/webhook"))
+    try:
+        async with aiohttp.ClientSession() as session:
+            for headers in ({}, {"X-Telegram-Bot-Api-Secret-Token": "wrong"}):
+                async with session.post(
+                    url, json=make_update(1), headers=headers
+                ) as response:
+                    assert response.status == 401
+    finally:
+        await server.close()
+    assert handled == []
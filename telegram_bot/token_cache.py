@@ -0,0 +1,159 @@
+"""Кэш токенов API по telegram_id для UserMiddleware.
+
+Без кэша middleware вызывает /login_by_telegram_id на каждое сообщение, в
+том числе на каждый шаг диалога. Токен хранится до своего exp (читается из
+JWT без проверки подписи - ее проверяет API), а за
+BOT_TOKEN_REFRESH_AHEAD секунд до истечения обновляется в фоне: сообщение
+обслуживается старым токеном и не ждет API. Одновременные обновления для
+одного пользователя сливаются в один запрос. Токен, на который API ответил
+401, удаляется из кэша (см. provider/client.py).
+"""
+
+import os
+import json
+import time
+import base64
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+from loguru import logger
+from provider.models import AccessTokenResponse
+
+
+BOT_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("BOT_TOKEN_CACHE_MAX_ENTRIES", 10000))
+BOT_TOKEN_REFRESH_AHEAD = float(os.getenv("BOT_TOKEN_REFRESH_AHEAD", 60))
+# Срок хранения токена без exp
+BOT_TOKEN_DEFAULT_TTL = float(os.getenv("BOT_TOKEN_DEFAULT_TTL", 60))
+
+Loader = Callable[[], Awaitable[Optional[AccessTokenResponse]]]
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """exp из полезной нагрузки JWT или None"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp is not None else None
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return None
+
+
+class TokenCache:
+    def __init__(
+        self,
+        max_entries: int = BOT_TOKEN_CACHE_MAX_ENTRIES,
+        refresh_ahead: float = BOT_TOKEN_REFRESH_AHEAD,
+        default_ttl: float = BOT_TOKEN_DEFAULT_TTL,
+        clock=time.time,
+    ):
+        self.max_entries = max_entries
+        self.refresh_ahead = refresh_ahead
+        self.default_ttl = default_ttl
+        self.clock = clock
+        # telegram_id -> (токен, момент истечения, момент фонового обновления)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._owners: Dict[str, int] = {}
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    async def get(
+        self, telegram_id: int, loader: Loader
+    ) -> Optional[AccessTokenResponse]:
+        """Токен из кэша; при отсутствии или истечении - через loader"""
+        if self.max_entries <= 0:
+            return await loader()
+        entry = self._entries.get(telegram_id)
+        now = self.clock()
+        if entry is not None and now < entry[1]:
+            self.hits += 1
+            self._entries.move_to_end(telegram_id)
+            if now >= entry[2]:
+                # Обновление в фоне, сообщение обслуживается текущим токеном
+                self._refresh(telegram_id, loader)
+            return entry[0]
+        self.misses += 1
+        # shield: отмена одного ожидающего не отменяет загрузку для остальных
+        return await asyncio.shield(self._refresh(telegram_id, loader))
+
+    def _refresh(self, telegram_id: int, loader: Loader) -> asyncio.Task:
+        """Одна задача загрузки на пользователя, остальные вызовы ждут ее"""
+        task = self._inflight.get(telegram_id)
+        if task is None:
+            task = asyncio.create_task(self._load(telegram_id, loader))
+            self._inflight[telegram_id] = task
+            task.add_done_callback(lambda done: self._forget(telegram_id, done))
+        return task
+
+    def _forget(self, telegram_id: int, task: asyncio.Task):
+        if self._inflight.get(telegram_id) is task:
+            del self._inflight[telegram_id]
+
+    async def _load(self, telegram_id: int, loader: Loader):
+        self.refreshes += 1
+        try:
+            user = await loader()
+        except Exception as e:
+            logger.error(f"Ошибка обновления токена пользователя {telegram_id}: {e}")
+            user = None
+        if self._inflight.get(telegram_id) is not asyncio.current_task():
+            # Пока шел запрос, токен сбросили (/login): результат устарел
+            return user
+        if user is None:
+            # Ошибка API или пользователь не найден: при фоновом обновлении
+            # текущий токен доживает до exp
+            entry = self._entries.get(telegram_id)
+            if entry is not None and self.clock() < entry[1]:
+                return entry[0]
+            self._entries.pop(telegram_id, None)
+            return None
+        now = self.clock()
+        expires_at = token_expiry(user.access_token)
+        if expires_at is None:
+            expires_at = now + self.default_ttl
+        # Короткоживущий токен обновляется не раньше середины срока жизни
+        refresh_at = expires_at - min(self.refresh_ahead, (expires_at - now) / 2)
+        old = self._entries.pop(telegram_id, None)
+        if old is not None:
+            self._owners.pop(old[0].access_token, None)
+        self._entries[telegram_id] = (user, expires_at, refresh_at)
+        self._owners[user.access_token] = telegram_id
+        while len(self._entries) > self.max_entries:
+            _, (old, *_) = self._entries.popitem(last=False)
+            self._owners.pop(old.access_token, None)
+        return user
+
+    def evict(self, telegram_id: int):
+        """Удаление токена пользователя, например после /login или /register"""
+        self._inflight.pop(telegram_id, None)
+        entry = self._entries.pop(telegram_id, None)
+        if entry is not None:
+            self._owners.pop(entry[0].access_token, None)
+
+    def evict_token(self, token: str):
+        """Удаление токена, отклоненного API (401)"""
+        telegram_id = self._owners.get(token)
+        if telegram_id is not None:
+            self.evictions += 1
+            logger.info(f"Токен пользователя {telegram_id} отклонен API, сброшен")
+            self.evict(telegram_id)
+
+    async def close(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+        }
+
+
+token_cache = TokenCache()
@@ -0,0 +1,131 @@
+"""Режим webhook: Telegram присылает обновления POST-запросами.
+
+Включается переменной BOT_WEBHOOK_URL (внешний https-адрес бота). Обновления
+принимает aiohttp-приложение: заголовок X-Telegram-Bot-Api-Secret-Token
+сверяется с BOT_WEBHOOK_SECRET (без секрета бот в этом режиме не запускается:
+иначе любой, кто знает адрес, может прислать обновление от чужого имени), ответ Telegram отдается сразу, а обновление
+обрабатывается отдельной задачей. Одновременно выполняется не больше
+BOT_MAX_CONCURRENT_UPDATES обработчиков, остальные задачи ждут. Если принятых,
+но не обработанных обновлений уже BOT_MAX_PENDING_UPDATES, новое не
+принимается: ответ 503, и Telegram повторит доставку позже.
+
+При SIGTERM/SIGINT сервер перестает принимать запросы и ждет начатые
+обработчики до BOT_SHUTDOWN_TIMEOUT секунд.
+"""
+
+import os
+import re
+import signal
+import asyncio
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from loguru import logger
+
+
+BOT_WEBHOOK_URL = os.getenv("BOT_WEBHOOK_URL", "")
+BOT_WEBHOOK_PATH = os.getenv("BOT_WEBHOOK_PATH", "/webhook")
+BOT_WEBHOOK_SECRET = os.getenv("BOT_WEBHOOK_SECRET", "")
+BOT_WEBHOOK_HOST = os.getenv("BOT_WEBHOOK_HOST", "0.0.0.0")
+BOT_WEBHOOK_PORT = int(os.getenv("BOT_WEBHOOK_PORT", 8080))
+BOT_MAX_CONCURRENT_UPDATES = int(os.getenv("BOT_MAX_CONCURRENT_UPDATES", 100))
+BOT_MAX_PENDING_UPDATES = int(os.getenv("BOT_MAX_PENDING_UPDATES", 1000))
+BOT_SHUTDOWN_TIMEOUT = float(os.getenv("BOT_SHUTDOWN_TIMEOUT", 30))
+# Отбрасывать ли накопившиеся в Telegram обновления при регистрации webhook
+BOT_DROP_PENDING_UPDATES = os.getenv("BOT_DROP_PENDING_UPDATES", "false") == "true"
+
+# Допустимый секрет по документации Bot API
+SECRET_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,256}")
+
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """Обработка обновлений задачами с ограничением числа одновременных"""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: str = BOT_WEBHOOK_SECRET,
+        max_concurrent: int = BOT_MAX_CONCURRENT_UPDATES,
+        max_pending: int = BOT_MAX_PENDING_UPDATES,
+        shutdown_timeout: float = BOT_SHUTDOWN_TIMEOUT,
+        **data,
+    ):
+        if not SECRET_PATTERN.fullmatch(secret_token or ""):
+            raise ValueError(
+                "BOT_WEBHOOK_SECRET обязателен в режиме webhook: 1-256 символов "
+                "A-Z, a-z, 0-9, _ и -"
+            )
+        super().__init__(
+            dispatcher,
+            bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data,
+        )
+        self.max_pending = max_pending
+        self.shutdown_timeout = shutdown_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    @property
+    def pending(self) -> int:
+        """Принятые, но еще не обработанные обновления"""
+        return len(self._background_feed_update_tasks)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request):
+        # Ограничение до создания задачи: иначе при всплеске копятся задачи в памяти
+        if self.pending >= self.max_pending:
+            return web.Response(status=503, headers={"Retry-After": "1"})
+        return await super()._handle_request_background(bot, request)
+
+    async def _background_feed_update(self, bot: Bot, update: dict):
+        async with self._semaphore:
+            await super()._background_feed_update(bot, update)
+
+    async def close(self):
+        """Ожидание начатых обработчиков, затем закрытие сессии бота"""
+        tasks = set(self._background_feed_update_tasks)
+        if tasks:
+            logger.info(f"Ожидание обработки {len(tasks)} обновлений")
+            _, pending = await asyncio.wait(tasks, timeout=self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning(f"Прервана обработка {len(pending)} обновлений")
+        await super().close()
+
+
+def create_app(
+    dp: Dispatcher, bot: Bot, path: str = BOT_WEBHOOK_PATH, **handler_options
+) -> web.Application:
+    app = web.Application()
+    LimitedRequestHandler(dp, bot, **handler_options).register(app, path=path)
+    # startup/shutdown диспетчера вызываются вместе с приложением
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    """Регистрация webhook в Telegram и работа сервера до SIGTERM/SIGINT"""
+    # Приложение создается до set_webhook: без секрета webhook не регистрируется
+    runner = web.AppRunner(create_app(dp, bot))
+    await bot.set_webhook(
+        BOT_WEBHOOK_URL.rstrip("/") + BOT_WEBHOOK_PATH,
+        secret_token=BOT_WEBHOOK_SECRET,
+        allowed_updates=dp.resolve_used_update_types(),
+        drop_pending_updates=BOT_DROP_PENDING_UPDATES,
+    )
+    await runner.setup()
+    site = web.TCPSite(runner, BOT_WEBHOOK_HOST, BOT_WEBHOOK_PORT)
+    await site.start()
+    logger.info(f"Webhook слушает {BOT_WEBHOOK_HOST}:{BOT_WEBHOOK_PORT}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        # cleanup закрывает сокет, затем ждет обработчики (LimitedRequestHandler.close)
+        await runner.cleanup()